@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# Runs export_metadata.py and import_metadata.py against mock_server.py for
+# synthetic repositories of several sizes and reports wall time, request count
+# and peak RSS of each run.
+#
+# The scripts inherit this process's environment, so EXPORT_* / IMPORT_* /
+# HTTP_CACHE_* settings can be compared by rerunning with different values.
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from urllib.request import urlopen
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_DIR = os.path.join(os.path.dirname(BENCH_DIR), "script")
+ORG = "bench"
+REPO = "synthetic"
+GIT_IDENTITY = ["-c", "user.name=Benchmark", "-c", "user.email=benchmark@localhost"]
+
+
+def git(*args):
+    return subprocess.run(["git", *GIT_IDENTITY, *args], check=True, capture_output=True, text=True).stdout.strip()
+
+
+def prepare_repos(run_dir):
+    # A one-commit mirror under repos/ with a "gitlab" remote pointing at a local bare repo,
+    # as import_metadata.py expects after the repository import step.
+    source = os.path.join(run_dir, "source")
+    mirror = os.path.join(run_dir, "repos", REPO)
+    target = os.path.join(run_dir, "gitlab.git")
+    git("init", "-q", source)
+    git("-C", source, "commit", "-q", "--allow-empty", "-m", "Synthetic repository")
+    git("clone", "-q", "--mirror", source, mirror)
+    git("init", "-q", "--bare", target)
+    git("-C", mirror, "remote", "add", "gitlab", target)
+    return git("-C", source, "rev-parse", "HEAD")
+
+
+def start_server(env):
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "mock_server.py"), "0"],
+        env=env, stdout=subprocess.PIPE, text=True,
+    )
+    line = server.stdout.readline()
+    if "http://" not in line:
+        server.kill()
+        print(f"❌ Mock server did not start: {line}")
+        sys.exit(1)
+    return server, line.strip().rsplit(" ", 1)[1]
+
+
+def server_stats(base_url):
+    with urlopen(f"{base_url}/__stats") as resp:
+        return json.load(resp)
+
+
+def run_script(args, env, log_path):
+    # os.wait4 reports the resource usage of this child alone, including its peak RSS.
+    started = time.time()
+    with open(log_path, "w") as log:
+        proc = subprocess.Popen([sys.executable, *args], env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return {
+        "exit_code": proc.returncode,
+        "seconds": round(time.time() - started, 2),
+        # ru_maxrss is in kilobytes on Linux.
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+    }
+
+
+def measure(phase, args, env, base_url, log_path):
+    before = server_stats(base_url)
+    result = run_script(args, env, log_path)
+    after = server_stats(base_url)
+    endpoints = {
+        key: count - before["endpoints"].get(key, 0)
+        for key, count in after["endpoints"].items()
+        if count != before["endpoints"].get(key, 0)
+    }
+    result.update({
+        "phase": phase,
+        "requests": after["requests"] - before["requests"],
+        "rate_limited": after["rate_limited"] - before["rate_limited"],
+        "not_modified": after["not_modified"] - before["not_modified"],
+        "endpoints": endpoints,
+    })
+    status = "✅" if result["exit_code"] == 0 else "❌"
+    print(f"{status} {phase}: {result['seconds']}s, {result['requests']} requests, {result['peak_rss_mb']} MB peak RSS")
+    return result
+
+
+def benchmark(size, work_dir, settings):
+    run_dir = os.path.join(work_dir, str(size))
+    if os.path.exists(run_dir):
+        shutil.rmtree(run_dir)
+    os.makedirs(run_dir)
+    sha = prepare_repos(run_dir)
+
+    pulls = round(size * settings["pull_share"])
+    server_env = {
+        **os.environ,
+        "MOCK_ISSUES": str(size - pulls),
+        "MOCK_PULLS": str(pulls),
+        "MOCK_COMMENTS": str(settings["comments"]),
+        "MOCK_HEAD_SHA": sha,
+        "MOCK_BASE_SHA": sha,
+        "MOCK_REPOS": REPO,
+    }
+    server, base_url = start_server(server_env)
+    host = base_url.split("://", 1)[1]
+    print(f"\n📏 {size} items ({size - pulls} issues, {pulls} pull requests) on {base_url}")
+
+    env = {
+        **os.environ,
+        "GH_TOKEN": os.getenv("GH_TOKEN", "benchmark"),
+        "GL_TOKEN": os.getenv("GL_TOKEN", "benchmark"),
+        "GITHUB_API_URL": base_url,
+        "GITLAB_SCHEME": "http",
+        "USER_CACHE_FILE": os.path.join(run_dir, "gitlab-users.json"),
+        "PYTHONUNBUFFERED": "1",
+    }
+    results = []
+    try:
+        if "export" in settings["phases"]:
+            results.append(measure(
+                "export",
+                [os.path.join(SCRIPT_DIR, "export_metadata.py"), ORG, REPO, os.path.join(run_dir, "metadata")],
+                env, base_url, os.path.join(run_dir, "export.log"),
+            ))
+        if "import" in settings["phases"]:
+            results.append(measure(
+                "import",
+                [os.path.join(SCRIPT_DIR, "import_metadata.py"), ORG, host, ORG, run_dir],
+                env, base_url, os.path.join(run_dir, "import.log"),
+            ))
+    finally:
+        server.terminate()
+        server.wait()
+    for result in results:
+        result["size"] = size
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: benchmark.py <comma_separated_sizes> <work_dir>")
+        print("Example: benchmark.py 1000,10000,100000 /tmp/action-hero-bench")
+        sys.exit(1)
+
+    try:
+        sizes = [int(size) for size in sys.argv[1].split(",") if size.strip()]
+        settings = {
+            # BENCH_PULL_SHARE is the fraction of items that are pull requests.
+            "pull_share": float(os.getenv("BENCH_PULL_SHARE", "0.2")),
+            # BENCH_COMMENTS is the number of comments on every issue and PR.
+            "comments": int(os.getenv("BENCH_COMMENTS", "2")),
+        }
+    except ValueError:
+        print("Sizes, BENCH_PULL_SHARE and BENCH_COMMENTS must be numbers")
+        sys.exit(1)
+    # BENCH_PHASES selects what runs; import reads the export's output.
+    settings["phases"] = os.getenv("BENCH_PHASES", "export,import").split(",")
+    work_dir = os.path.abspath(sys.argv[2])
+
+    results = []
+    for size in sizes:
+        results.extend(benchmark(size, work_dir, settings))
+
+    # --- Summary ---
+    print(f"\n{'items':>8} {'phase':<8} {'exit':>4} {'secs':>9} {'requests':>9} {'limited':>8} {'RSS MB':>8}")
+    for result in results:
+        print(
+            f"{result['size']:>8} {result['phase']:<8} {result['exit_code']:>4} {result['seconds']:>9} "
+            f"{result['requests']:>9} {result['rate_limited']:>8} {result['peak_rss_mb']:>8}"
+        )
+    with open(os.path.join(work_dir, "benchmark.json"), "w") as f:
+        json.dump({"settings": settings, "results": results}, f, indent=2)
+    print(f"\n📄 Results written to {os.path.join(work_dir, 'benchmark.json')}")
+
+    if any(result["exit_code"] != 0 for result in results):
+        sys.exit(1)
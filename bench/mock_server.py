@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+# Local stand-in for the GitHub REST and GitLab v4 endpoints used by the
+# export and import scripts, serving one synthetic repository.
+#
+# GitHub data is generated on the fly from the item number, so a 100k item
+# repo costs no memory; GitLab objects created by the importer are kept in
+# memory. Listings are paginated with Link headers, every request can be
+# delayed by a fixed latency, and a per-window request budget is enforced
+# with the same headers and 403/429 replies the real APIs send; GitHub's
+# budget is kept per token, like the real one.
+# GET /__stats returns request counts per endpoint.
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit
+
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+LOGINS = [f"user{i}" for i in range(20)]
+LABELS = [{"id": i + 1, "name": f"label-{i}", "color": "ededed", "description": f"Synthetic label {i}"} for i in range(10)]
+MILESTONES = [
+    {"id": i + 1, "number": i + 1, "title": f"v{i + 1}.0", "state": "open", "description": "", "due_on": None}
+    for i in range(5)
+]
+
+
+def timestamp(seconds):
+    return (EPOCH + timedelta(seconds=seconds)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def user(n):
+    login = LOGINS[n % len(LOGINS)]
+    return {"login": login, "id": n % len(LOGINS) + 1, "type": "User"}
+
+
+class Synthetic:
+    # A read-only sequence whose elements are built on access, sliced like a list.
+    def __init__(self, count, make):
+        self.count = max(0, count)
+        self.make = make
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return [self.make(i) for i in range(*index.indices(self.count))]
+
+    def since(self, since, key):
+        # Drop the leading elements updated before `since`; elements are ordered by `key`.
+        if not since:
+            return self
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.make(mid)[key] < since:
+                lo = mid + 1
+            else:
+                hi = mid
+        return Synthetic(self.count - lo, lambda i: self.make(i + lo))
+
+
+class RateLimiter:
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.lock = threading.Lock()
+        self.used = 0
+        self.reset_at = 0
+
+    def take(self):
+        # Returns (allowed, remaining, reset epoch seconds).
+        with self.lock:
+            now = time.time()
+            if now >= self.reset_at:
+                self.used = 0
+                self.reset_at = int(now + self.window) + 1
+            if self.limit and self.used >= self.limit:
+                return False, 0, self.reset_at
+            self.used += 1
+            return True, max(0, self.limit - self.used) if self.limit else 5000, self.reset_at
+
+    def refund(self):
+        with self.lock:
+            self.used = max(0, self.used - 1)
+
+
+class MockApi:
+    def __init__(self, issues, pulls, comments, head_sha, base_sha, repos):
+        self.issue_count = issues
+        self.pull_count = pulls
+        self.total = issues + pulls
+        self.comments = comments
+        self.head_sha = head_sha
+        self.base_sha = base_sha
+        self.repos = repos
+        self.lock = threading.Lock()
+        self.projects = {}
+
+    # --- GitHub ---
+
+    def is_pull(self, number):
+        return number > self.issue_count
+
+    def comment(self, base, org, repo, number, j, review=False):
+        kind = "pulls" if review else "issues"
+        comment = {
+            "id": number * 1000 + (500 if review else 0) + j,
+            "body": f"Synthetic {'review ' if review else ''}comment {j} on #{number}",
+            "user": user(number + j),
+            "created_at": timestamp(number * 3600 + 60 * (j + 1)),
+            "updated_at": timestamp(number * 3600 + 60 * (j + 1)),
+            "html_url": f"https://github.com/{org}/{repo}/{kind}/{number}#comment-{j}",
+            f"{'pull_request' if review else 'issue'}_url": f"{base}/repos/{org}/{repo}/{kind}/{number}",
+        }
+        if review:
+            comment.update({"path": f"src/module_{number % 7}.py", "line": j + 1, "diff_hunk": "@@ -1,3 +1,4 @@"})
+        return comment
+
+    def item(self, base, org, repo, number):
+        item = {
+            "id": number,
+            "number": number,
+            "title": f"Synthetic {'pull request' if self.is_pull(number) else 'issue'} {number}",
+            "body": f"Body of item {number}.\n\n" + "Lorem ipsum dolor sit amet. " * 8,
+            "state": "closed" if number % 3 == 0 else "open",
+            "created_at": timestamp(number * 3600),
+            "updated_at": timestamp(number * 3600 + 1800),
+            "closed_at": timestamp(number * 3600 + 1800) if number % 3 == 0 else None,
+            "user": user(number),
+            "labels": [LABELS[number % len(LABELS)]],
+            "milestone": MILESTONES[number % len(MILESTONES)],
+            "assignee": user(number + 1),
+            "assignees": [user(number + 1)],
+            "comments": self.comments,
+            "comments_url": f"{base}/repos/{org}/{repo}/issues/{number}/comments",
+            "html_url": f"https://github.com/{org}/{repo}/issues/{number}",
+        }
+        if self.is_pull(number):
+            item["pull_request"] = {"url": f"{base}/repos/{org}/{repo}/pulls/{number}"}
+        return item
+
+    def pull(self, base, org, repo, number):
+        pr = self.item(base, org, repo, number)
+        del pr["comments"], pr["comments_url"], pr["pull_request"]
+        pr.update({
+            "html_url": f"https://github.com/{org}/{repo}/pull/{number}",
+            "head": {"ref": f"feature-{number}", "sha": self.head_sha},
+            "base": {"ref": "main", "sha": self.base_sha},
+            "merged_at": pr["closed_at"],
+        })
+        return pr
+
+    def org_repos(self, base, query, payload, org):
+        return 200, [self.repo(base, query, payload, org, name)[1] for name in self.repos]
+
+    def repo(self, base, query, payload, org, repo):
+        return 200, {
+            "name": repo,
+            "full_name": f"{org}/{repo}",
+            "open_issues_count": self.total,
+            "size": self.total,
+        }
+
+    def issues(self, base, query, payload, org, repo):
+        if query.get("direction") == "asc":
+            items = Synthetic(self.total, lambda i: self.item(base, org, repo, i + 1))
+            return 200, items.since(query.get("since"), "updated_at")
+        return 200, Synthetic(self.total, lambda i: self.item(base, org, repo, self.total - i))
+
+    def pulls(self, base, query, payload, org, repo):
+        # Newest first; with these timestamps created and updated order are the same.
+        return 200, Synthetic(self.pull_count, lambda i: self.pull(base, org, repo, self.total - i))
+
+    def all_issue_comments(self, base, query, payload, org, repo):
+        c = self.comments
+        items = Synthetic(self.total * c, lambda i: self.comment(base, org, repo, i // c + 1, i % c))
+        return 200, items.since(query.get("since"), "updated_at")
+
+    def all_review_comments(self, base, query, payload, org, repo):
+        c = self.comments
+        first = self.issue_count + 1
+        items = Synthetic(self.pull_count * c, lambda i: self.comment(base, org, repo, first + i // c, i % c, review=True))
+        return 200, items.since(query.get("since"), "updated_at")
+
+    def issue_comments(self, base, query, payload, org, repo, number):
+        number = int(number)
+        if not 0 < number <= self.total:
+            return 404, {"message": "Not Found"}
+        return 200, Synthetic(self.comments, lambda j: self.comment(base, org, repo, number, j))
+
+    def review_comments(self, base, query, payload, org, repo, number):
+        number = int(number)
+        if not self.is_pull(number) or number > self.total:
+            return 404, {"message": "Not Found"}
+        return 200, Synthetic(self.comments, lambda j: self.comment(base, org, repo, number, j, review=True))
+
+    def requested_reviewers(self, base, query, payload, org, repo, number):
+        return 200, {"users": [user(int(number) + 2)], "teams": []}
+
+    def files(self, base, query, payload, org, repo, number):
+        number = int(number)
+        return 200, [
+            {
+                "filename": f"src/module_{(number + k) % 7}.py",
+                "status": "modified",
+                "additions": k + 1,
+                "deletions": k,
+                "changes": 2 * k + 1,
+                "patch": "@@ -1,3 +1,4 @@\n-old\n+new\n+added",
+            }
+            for k in range(3)
+        ]
+
+    def commits(self, base, query, payload, org, repo, number):
+        number = int(number)
+        return 200, [
+            {
+                "sha": self.head_sha,
+                "commit": {
+                    "message": f"Change {k} for #{number}",
+                    "author": {"name": "Synthetic", "email": "synthetic@example.com", "date": timestamp(number * 3600 + k)},
+                },
+                "author": user(number),
+                "html_url": f"https://github.com/{org}/{repo}/commit/{self.head_sha}",
+            }
+            for k in range(2)
+        ]
+
+    def labels(self, base, query, payload, org, repo):
+        return 200, LABELS
+
+    def milestones(self, base, query, payload, org, repo):
+        return 200, MILESTONES
+
+    # --- GitLab ---
+
+    def project_store(self, project):
+        with self.lock:
+            for store in self.projects.values():
+                if project in (str(store["id"]), store["path_with_namespace"]):
+                    return store
+            store = {
+                "id": len(self.projects) + 1,
+                "path_with_namespace": project,
+                "issues": [],
+                "merge_requests": [],
+                "milestones": [],
+                "labels": [],
+                "notes": 0,
+            }
+            self.projects[project] = store
+            return store
+
+    def groups(self, base, query, payload):
+        group = query.get("search", "")
+        return 200, [{"id": 1, "name": group, "path": group, "full_path": group}]
+
+    def users(self, base, query, payload):
+        username = query.get("username", "")
+        if username not in LOGINS:
+            return 200, []
+        return 200, [{"id": LOGINS.index(username) + 1, "username": username}]
+
+    def project(self, base, query, payload, project):
+        store = self.project_store(unquote(project))
+        return 200, {"id": store["id"], "path_with_namespace": store["path_with_namespace"]}
+
+    def list_objects(self, base, query, payload, project, kind):
+        store = self.project_store(unquote(project))
+        if kind not in store:
+            return 404, {"message": "404 Not Found"}
+        with self.lock:
+            return 200, list(store[kind])
+
+    def create_object(self, base, query, payload, project, kind):
+        store = self.project_store(unquote(project))
+        if kind not in store:
+            return 404, {"message": "404 Not Found"}
+        title = payload.get("name") if kind == "labels" else payload.get("title")
+        if not title:
+            return 400, {"message": "title is missing"}
+        with self.lock:
+            objects = store[kind]
+            if kind in ("milestones", "labels") and any(o.get("title", o.get("name")) == title for o in objects):
+                return 409, {"message": "already exists"}
+            obj = {**payload, "id": store["id"] * 10 ** 7 + len(objects) + 1, "iid": len(objects) + 1, "state": "opened"}
+            objects.append(obj)
+        return 201, obj
+
+    def update_object(self, base, query, payload, project, kind, iid):
+        store = self.project_store(unquote(project))
+        # Issues and merge requests are addressed by iid, milestones and labels by id.
+        key = "id" if kind in ("milestones", "labels") else "iid"
+        with self.lock:
+            obj = next((o for o in store.get(kind, []) if str(o[key]) == iid), None)
+            if obj is None:
+                return 404, {"message": "404 Not Found"}
+            obj.update(payload)
+            if payload.get("state_event") == "close":
+                obj["state"] = "closed"
+        return 200, obj
+
+    def create_note(self, base, query, payload, project, kind, iid):
+        store = self.project_store(unquote(project))
+        with self.lock:
+            store["notes"] += 1
+            note_id = store["notes"]
+        return 201, {"id": note_id, "body": payload.get("body", "")}
+
+
+ROUTES = [
+    ("GET", "/orgs/:org/repos", "org_repos"),
+    ("GET", "/repos/:org/:repo", "repo"),
+    ("GET", "/repos/:org/:repo/issues", "issues"),
+    ("GET", "/repos/:org/:repo/issues/comments", "all_issue_comments"),
+    ("GET", "/repos/:org/:repo/issues/:number/comments", "issue_comments"),
+    ("GET", "/repos/:org/:repo/pulls", "pulls"),
+    ("GET", "/repos/:org/:repo/pulls/comments", "all_review_comments"),
+    ("GET", "/repos/:org/:repo/pulls/:number/comments", "review_comments"),
+    ("GET", "/repos/:org/:repo/pulls/:number/requested_reviewers", "requested_reviewers"),
+    ("GET", "/repos/:org/:repo/pulls/:number/files", "files"),
+    ("GET", "/repos/:org/:repo/pulls/:number/commits", "commits"),
+    ("GET", "/repos/:org/:repo/labels", "labels"),
+    ("GET", "/repos/:org/:repo/milestones", "milestones"),
+    ("GET", "/api/v4/groups", "groups"),
+    ("GET", "/api/v4/users", "users"),
+    ("GET", "/api/v4/projects/:project", "project"),
+    ("GET", "/api/v4/projects/:project/:kind", "list_objects"),
+    ("POST", "/api/v4/projects/:project/:kind", "create_object"),
+    ("PUT", "/api/v4/projects/:project/:kind/:iid", "update_object"),
+    ("POST", "/api/v4/projects/:project/:kind/:iid/notes", "create_note"),
+]
+COMPILED_ROUTES = [(method, template, re.compile(re.sub(r":\w+", "([^/]+)", template)), name) for method, template, name in ROUTES]
+
+
+def route(method, path):
+    for route_method, template, pattern, name in COMPILED_ROUTES:
+        match = pattern.fullmatch(path)
+        if match and route_method == method:
+            return template, name, match.groups()
+    return "unmatched", None, ()
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.requests = 0
+        self.rate_limited = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+
+    def count(self, key, status, size):
+        with self.lock:
+            self.requests += 1
+            self.endpoints[key] = self.endpoints.get(key, 0) + 1
+            self.bytes_sent += size
+            if status in (403, 429):
+                self.rate_limited += 1
+            elif status == 304:
+                self.not_modified += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "rate_limited": self.rate_limited,
+                "not_modified": self.not_modified,
+                "bytes_sent": self.bytes_sent,
+                "endpoints": dict(self.endpoints),
+            }
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this keep-alive replies stall on delayed ACKs.
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.handle_api("GET")
+
+    def do_POST(self):
+        self.handle_api("POST")
+
+    def do_PUT(self):
+        self.handle_api("PUT")
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle_api(self, method):
+        server = self.server
+        url = urlsplit(self.path)
+        query = dict(parse_qsl(url.query))
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+        if url.path == "/__stats":
+            self.send_json(200, server.stats.snapshot(), {})
+            return
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        gitlab = url.path.startswith("/api/v4/")
+        limiter = server.gitlab_limit if gitlab else server.github_limiter(self.headers.get("Authorization"))
+        allowed, remaining, reset_at = limiter.take()
+        prefix = "RateLimit" if gitlab else "X-RateLimit"
+        headers = {
+            f"{prefix}-Limit": str(limiter.limit or 5000),
+            f"{prefix}-Remaining": str(remaining),
+            f"{prefix}-Reset": str(reset_at),
+        }
+        template, name, params = route(method, url.path)
+        key = f"{method} {template}"
+
+        if not allowed:
+            if gitlab:
+                headers["Retry-After"] = str(max(1, int(reset_at - time.time())))
+            status, body = (429, {"message": "Retry later"}) if gitlab else (403, {"message": "API rate limit exceeded"})
+        elif name is None:
+            status, body = 404, {"message": "Not Found"}
+        else:
+            base = f"http://{self.headers.get('Host')}"
+            status, body = getattr(server.api, name)(base, query, payload, *params)
+
+        if isinstance(body, (list, Synthetic)):
+            body = self.paginate(url, query, body, headers, gitlab)
+
+        data = json.dumps(body).encode()
+        if method == "GET" and status == 200 and not gitlab:
+            # GitHub does not count a 304 against the rate limit.
+            etag = f'"{hashlib.md5(data).hexdigest()}"'
+            headers["ETag"] = etag
+            if self.headers.get("If-None-Match") == etag:
+                limiter.refund()
+                headers[f"{prefix}-Remaining"] = str(remaining + 1)
+                status, data = 304, b""
+
+        server.stats.count(key, status, len(data))
+        self.send_bytes(status, data, headers)
+
+    def paginate(self, url, query, items, headers, gitlab):
+        try:
+            per_page = min(100, max(1, int(query.get("per_page", 20 if gitlab else 30))))
+            page = max(1, int(query.get("page", 1)))
+        except ValueError:
+            per_page, page = 30, 1
+        last = max(1, -(-len(items) // per_page))
+        links = []
+        for rel, target in (("prev", page - 1), ("next", page + 1), ("first", 1), ("last", last)):
+            if 1 <= target <= last and (rel in ("first", "last") or target != page):
+                page_url = f"http://{self.headers.get('Host')}{url.path}?{urlencode({**query, 'page': target})}"
+                links.append(f'<{page_url}>; rel="{rel}"')
+        if links:
+            headers["Link"] = ", ".join(links)
+        if gitlab:
+            headers.update({"X-Page": str(page), "X-Per-Page": str(per_page), "X-Total": str(len(items))})
+            if page < last:
+                headers["X-Next-Page"] = str(page + 1)
+        start = (page - 1) * per_page
+        return items[start:start + per_page]
+
+    def send_json(self, status, body, headers):
+        self.send_bytes(status, json.dumps(body).encode(), headers)
+
+    def send_bytes(self, status, data, headers):
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def build_server(port):
+    # MOCK_ISSUES / MOCK_PULLS / MOCK_COMMENTS size the synthetic repo; MOCK_COMMENTS is the
+    # number of comments (and review comments) on each item.
+    # MOCK_LATENCY_MS delays every request. MOCK_GITHUB_LIMIT / MOCK_GITLAB_LIMIT allow that many
+    # requests per MOCK_RATE_WINDOW seconds (0 disables the limit).
+    # MOCK_HEAD_SHA / MOCK_BASE_SHA are the commits PR branches point at; MOCK_REPOS lists the org's repos.
+    api = MockApi(
+        issues=int(os.getenv("MOCK_ISSUES", "800")),
+        pulls=int(os.getenv("MOCK_PULLS", "200")),
+        comments=int(os.getenv("MOCK_COMMENTS", "2")),
+        head_sha=os.getenv("MOCK_HEAD_SHA", "0" * 40),
+        base_sha=os.getenv("MOCK_BASE_SHA", "0" * 40),
+        repos=[name for name in os.getenv("MOCK_REPOS", "synthetic").split(",") if name],
+    )
+    window = float(os.getenv("MOCK_RATE_WINDOW", "60"))
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    server.api = api
+    server.stats = Stats()
+    server.latency = float(os.getenv("MOCK_LATENCY_MS", "0")) / 1000
+    github_limits = {}
+    github_lock = threading.Lock()
+
+    def github_limiter(token):
+        with github_lock:
+            if token not in github_limits:
+                github_limits[token] = RateLimiter(int(os.getenv("MOCK_GITHUB_LIMIT", "0")), window)
+            return github_limits[token]
+
+    server.github_limiter = github_limiter
+    server.gitlab_limit = RateLimiter(int(os.getenv("MOCK_GITLAB_LIMIT", "0")), window)
+    return server
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: mock_server.py <port>  (0 picks a free port)")
+        sys.exit(1)
+
+    server = build_server(int(sys.argv[1]))
+    print(f"🚀 Mock API listening on http://127.0.0.1:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
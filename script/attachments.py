@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# Mirrors the files attached to issue and PR bodies and comments.
+#
+# Exported text links uploads on user-images.githubusercontent.com and
+# github.com/.../assets, which stop resolving once the source is gone. This
+# stage scans the backup for those URLs, streams each file to disk on a
+# bounded pool and stores it under its SHA-256 in <backup_dir>/attachments, so
+# a file attached many times across the org is kept once. The importer then
+# uploads each stored file once per GitLab project and rewrites the links.
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sys
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlsplit
+
+import requests
+
+from backup_io import find_records, read_records
+from http_client import ApiClient
+
+# Uploaded images and files; trailing punctuation of the surrounding text is left out.
+ASSET_URL = re.compile(
+    r"https://(?:(?:private-)?user-images\.githubusercontent\.com|"
+    r"github\.com/(?:user-attachments|[\w.-]+/[\w.-]+)/(?:assets|files))"
+    r"/[^\s)\]\"'<>]*[^\s)\]\"'<>.,;:!?]"
+)
+CHUNK_SIZE = 1 << 16
+FILENAME = re.compile(r'filename="?([^";]+)"?')
+
+
+def asset_urls(record):
+    # URLs in the body of an issue or PR and in its comments and review comments.
+    texts = [record.get("body")]
+    for key in ("comments", "review_comments"):
+        texts += [comment.get("body") for comment in record.get(key) or [] if isinstance(comment, dict)]
+    for text in texts:
+        if text:
+            yield from (match.group(0) for match in ASSET_URL.finditer(text))
+
+
+def scan_repo(repo_path):
+    urls = {}
+    for name in ("issues", "pull_requests"):
+        for record in read_records(find_records(repo_path, name)):
+            urls.update((url, None) for url in asset_urls(record))
+    return list(urls)
+
+
+def filename_for(url, resp):
+    disposition = FILENAME.search(resp.headers.get("Content-Disposition", ""))
+    name = disposition.group(1) if disposition else unquote(urlsplit(url).path.rsplit("/", 1)[-1])
+    if "." not in name:
+        # github.com/user-attachments/assets/<uuid> carries no extension; GitLab previews by it.
+        name += mimetypes.guess_extension((resp.headers.get("Content-Type") or "").split(";")[0]) or ""
+    return name
+
+
+class AttachmentStore:
+    # Content-addressed files plus a manifest mapping each source URL to its file.
+    def __init__(self, root):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self.lock = threading.Lock()
+        self.files = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.files = json.load(f)
+
+    @classmethod
+    def open(cls, root):
+        # None when the attachment stage has not run for this backup.
+        return cls(root) if os.path.exists(os.path.join(root, "manifest.json")) else None
+
+    def object_path(self, sha256):
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    def get(self, url):
+        with self.lock:
+            entry = self.files.get(url)
+        return entry if entry and os.path.exists(self.object_path(entry["sha256"])) else None
+
+    def download(self, client, url, headers):
+        resp = client.get(url, stream=True, headers=headers)
+        if resp.status_code != 200:
+            resp.close()
+            print(f"⚠️ Could not download {url}: {resp.status_code}")
+            return None
+        os.makedirs(self.objects_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.objects_dir, suffix=".tmp")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with resp, os.fdopen(fd, "wb") as f:
+                for chunk in resp.iter_content(CHUNK_SIZE):
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+        except requests.RequestException as e:
+            os.remove(tmp_path)
+            print(f"⚠️ Download of {url} failed: {e}")
+            return None
+        path = self.object_path(digest.hexdigest())
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            # The same bytes were already stored from another URL.
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+        entry = {
+            "sha256": digest.hexdigest(),
+            "filename": filename_for(url, resp),
+            "size": size,
+            "content_type": resp.headers.get("Content-Type"),
+        }
+        with self.lock:
+            self.files[url] = entry
+        return entry
+
+    def save(self):
+        # Held throughout: several export workers of one process may save the shared store.
+        os.makedirs(self.root, exist_ok=True)
+        with self.lock:
+            tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.files, f, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+
+
+def download_client(workers):
+    # Separate from the API client: downloads carry no rate-limit headers and are
+    # streamed, and the token is only sent to github.com, never to the CDN hosts.
+    return ApiClient({}, pool_size=max(32, workers))
+
+
+def mirror_attachments(client, store, urls, workers):
+    token = os.getenv("GH_TOKEN") or os.getenv("GH_TOKENS", "").split(",")[0].strip()
+    pending = [url for url in urls if store.get(url) is None]
+
+    def fetch(url):
+        headers = {"Authorization": f"Bearer {token}"} if token and urlsplit(url).hostname == "github.com" else {}
+        try:
+            return store.download(client, url, headers)
+        except requests.RequestException as e:
+            print(f"⚠️ Download of {url} failed: {e}")
+            return None
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(fetch, pending))
+    else:
+        results = [fetch(url) for url in pending]
+    store.save()
+    downloaded = [entry for entry in results if entry is not None]
+    return {
+        "urls": len(urls),
+        "downloaded": len(downloaded),
+        "failed": len(pending) - len(downloaded),
+        "bytes": sum(entry["size"] for entry in downloaded),
+    }
+
+
+class MultipartFile:
+    # A multipart/form-data body holding one file, read from disk as it is sent. requests
+    # reads files= uploads into memory whole; a file-like body with a length is streamed.
+    def __init__(self, path, field, filename, content_type):
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        name = filename.replace('"', "%22").replace("\r", "%0D").replace("\n", "%0A")
+        self.head = (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{name}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+        self.tail = f"\r\n--{boundary}--\r\n".encode()
+        self.file = open(path, "rb")
+        self.length = len(self.head) + os.fstat(self.file.fileno()).st_size + len(self.tail)
+        self.position = 0
+
+    def __len__(self):
+        return self.length
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.file.close()
+
+    def seek(self, offset):
+        # Only rewinds, for a retried request.
+        self.position = offset
+        self.file.seek(0)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.length
+        chunks = []
+        while size > 0 and self.position < self.length:
+            file_end = self.length - len(self.tail)
+            if self.position < len(self.head):
+                chunk = self.head[self.position:self.position + size]
+            elif self.position < file_end:
+                chunk = self.file.read(min(size, file_end - self.position))
+            else:
+                start = self.position - file_end
+                chunk = self.tail[start:start + size]
+            chunks.append(chunk)
+            self.position += len(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+
+class AttachmentUploader:
+    # Uploads stored attachments to one GitLab project on first use and rewrites links to them.
+    # Uploads are recorded in the import journal, so a resumed import reuses them.
+    def __init__(self, client, project_url, store, journal):
+        self.client = client
+        self.project_url = project_url
+        self.store = store
+        self.journal = journal
+        self.lock = threading.Lock()
+
+    def upload(self, entry):
+        sha256 = entry["sha256"]
+        # One upload at a time, so notes posted concurrently never upload the same file twice.
+        with self.lock:
+            url = self.journal.uploaded(sha256)
+            if url is not None:
+                return url
+            path = self.store.object_path(sha256)
+            content_type = entry.get("content_type") or "application/octet-stream"
+            with MultipartFile(path, "file", entry["filename"], content_type) as body:
+                resp = self.client.post(
+                    f"{self.project_url}/uploads", data=body, headers={"Content-Type": body.content_type},
+                )
+            if resp.status_code != 201:
+                print(f" Failed to upload {entry['filename']}: {resp.status_code}: {resp.text}")
+                return None
+            url = resp.json()["url"]
+            self.journal.record("upload", sha256=sha256, url=url)
+            return url
+
+    def rewrite(self, text):
+        # Links to files the store does not have, or that failed to upload, are left as they are.
+        if not text or self.store is None:
+            return text
+
+        def replace(match):
+            entry = self.store.get(match.group(0))
+            url = self.upload(entry) if entry else None
+            return url or match.group(0)
+
+        return ASSET_URL.sub(replace, text)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: attachments.py <backup_dir>")
+        sys.exit(1)
+
+    backup_dir = sys.argv[1]
+    metadata_root = os.path.join(backup_dir, "metadata")
+    try:
+        # ATTACHMENT_WORKERS files are downloaded at once.
+        workers = int(os.getenv("ATTACHMENT_WORKERS", "8"))
+    except ValueError:
+        print("ATTACHMENT_WORKERS must be an integer")
+        sys.exit(1)
+    if not os.path.isdir(metadata_root):
+        # export_org.py writes <backup_dir>/metadata; without it nothing would be mirrored.
+        print(f"❌ No metadata to scan in: {metadata_root}")
+        sys.exit(1)
+
+    urls = {}
+    for repo in sorted(os.listdir(metadata_root)):
+        if os.path.isdir(os.path.join(metadata_root, repo)):
+            found = scan_repo(os.path.join(metadata_root, repo))
+            print(f"🔎 {repo}: {len(found)} attachment links")
+            urls.update((url, None) for url in found)
+
+    store = AttachmentStore(os.path.join(backup_dir, "attachments"))
+    result = mirror_attachments(download_client(workers), store, list(urls), workers)
+    print(f"📎 {result['urls']} attachments, {result['downloaded']} downloaded ({result['bytes'] >> 10} KiB), "
+          f"{result['failed']} failed, {len(set(e['sha256'] for e in store.files.values()))} unique files stored")
+    if result["failed"]:
+        # Deleted attachments keep their GitHub links; a rerun retries only the failed ones.
+        print(f"⚠️ {result['failed']} attachments were not mirrored")
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+# Reading and writing backup record files.
+#
+# Records are written as they are produced, either as JSONL (one record per
+# line), as a JSON array, or as normalized gzip-compressed JSONL, and read
+# back one at a time so memory use does not grow with the size of the
+# repository.
+#
+# The normalized format stores each distinct user, label, milestone and repo
+# object once, as an entity line written before the first record using it;
+# records refer to entities by {"$ref": [table, id]}.
+#
+# Issues and pull requests also get a sidecar <file>.idx mapping each number
+# to the byte range of its record, so RecordIndex can mmap the file and decode
+# single records. The gzip stream is fully flushed every BLOCK_SIZE bytes,
+# which lets a block be inflated on its own without the data before it.
+import gzip
+import json
+import mmap
+import os
+import threading
+import zlib
+
+FORMATS = ("json", "jsonl", "jsonl.gz")
+CHUNK_SIZE = 1 << 20
+BLOCK_SIZE = 1 << 18
+INDEX_VERSION = 1
+
+# Record fields holding an entity, or a list of entities, and the table they go in.
+ENTITY_FIELDS = {
+    "user": "users",
+    "assignee": "users",
+    "assignees": "users",
+    "requested_reviewers": "users",
+    "merged_by": "users",
+    "closed_by": "users",
+    "owner": "users",
+    "creator": "users",
+    "labels": "labels",
+    "milestone": "milestones",
+    "repo": "repos",
+}
+
+
+def find_records(directory, name):
+    # Prefer the normalized store, then JSONL, then the original pretty-printed .json files.
+    for fmt in ("jsonl.gz", "jsonl", "json"):
+        path = os.path.join(directory, f"{name}.{fmt}")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def records_fingerprint(directory):
+    # Name, size and mtime of each record file, so a re-export of the directory can be noticed.
+    fingerprint = {}
+    for name in ("issues", "pull_requests", "labels", "milestones"):
+        path = find_records(directory, name)
+        if path is not None:
+            stat = os.stat(path)
+            fingerprint[os.path.basename(path)] = [stat.st_size, stat.st_mtime_ns]
+    return fingerprint
+
+
+def read_records(path):
+    if path is None:
+        return
+    if path.endswith(".jsonl.gz"):
+        yield from _read_normalized(path)
+    elif path.endswith(".jsonl"):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path) as f:
+            yield from _iter_json_array(f)
+
+
+def _iter_json_array(f):
+    # Decodes a top-level JSON array element by element, reading the file in chunks.
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    started = False
+    eof = False
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if not started and pos < len(buf):
+            if buf[pos] != "[":
+                raise ValueError(f"Expected a JSON array in {f.name}")
+            started = True
+            pos += 1
+            continue
+        if started and pos < len(buf) and buf[pos] == "]":
+            return
+        try:
+            if pos >= len(buf):
+                raise ValueError
+            record, end = decoder.raw_decode(buf, pos)
+        except ValueError:
+            if eof:
+                if started and buf[pos:].strip():
+                    raise
+                return
+            chunk = f.read(CHUNK_SIZE)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        yield record
+        pos = end
+
+
+class _Normalizer:
+    # Replaces entities in records with references, writing each distinct entity once.
+    def __init__(self, f):
+        self.f = f
+        self.ids = {}
+        # Called with (table, id, position) for each entity line when the file is indexed.
+        self.on_entity = None
+
+    def entity(self, table, value):
+        if not isinstance(value, dict):
+            return value
+        value = self.record(value)
+        ids = self.ids.setdefault(table, {})
+        # Keyed by content, so differing copies of the same object both survive.
+        key = json.dumps(value, sort_keys=True)
+        if key not in ids:
+            ids[key] = len(ids) + 1
+            position = self.f.write(json.dumps({"table": table, "id": ids[key], "value": value}) + "\n")
+            if self.on_entity:
+                self.on_entity(table, ids[key], position)
+        return {"$ref": [table, ids[key]]}
+
+    def record(self, obj):
+        if isinstance(obj, list):
+            return [self.record(item) for item in obj]
+        if not isinstance(obj, dict):
+            return obj
+        normalized = {}
+        for key, value in obj.items():
+            table = ENTITY_FIELDS.get(key)
+            if table is None:
+                normalized[key] = self.record(value)
+            elif isinstance(value, list):
+                normalized[key] = [self.entity(table, item) for item in value]
+            else:
+                normalized[key] = self.entity(table, value)
+        return normalized
+
+
+def _resolve(obj, entities):
+    if isinstance(obj, list):
+        return [_resolve(item, entities) for item in obj]
+    if not isinstance(obj, dict):
+        return obj
+    if len(obj) == 1 and "$ref" in obj:
+        table, entity_id = obj["$ref"]
+        return entities[table, entity_id]
+    return {key: _resolve(value, entities) for key, value in obj.items()}
+
+
+def _read_normalized(path):
+    entities = {}
+    with gzip.open(path, "rt") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "table" in entry:
+                entities[entry["table"], entry["id"]] = _resolve(entry["value"], entities)
+            else:
+                yield _resolve(entry["record"], entities)
+
+
+class _BlockWriter:
+    # Text sink for the normalized format that tracks where each line lands: the gzip
+    # stream is fully flushed every BLOCK_SIZE bytes, and each line is located by its
+    # block and its offset in the block's inflated data.
+    def __init__(self, path):
+        self.raw = open(path, "wb")
+        self.gz = gzip.GzipFile(fileobj=self.raw, mode="wb", compresslevel=6)
+        self.gz.flush(zlib.Z_FULL_FLUSH)
+        self.blocks = []
+        self.start = self.raw.tell()
+        self.offset = 0
+
+    def write(self, line):
+        data = line.encode()
+        position = (len(self.blocks), self.offset, len(data))
+        self.gz.write(data)
+        self.offset += len(data)
+        if self.offset >= BLOCK_SIZE:
+            self.end_block()
+        return position
+
+    def end_block(self):
+        if self.offset:
+            self.gz.flush(zlib.Z_FULL_FLUSH)
+            self.blocks.append([self.start, self.raw.tell()])
+            self.start = self.raw.tell()
+            self.offset = 0
+
+    def close(self):
+        self.end_block()
+        self.gz.close()
+        self.raw.close()
+
+
+def write_records(path, records, index_key=None):
+    # With index_key, also writes <path>.idx locating each record by that field.
+    count = 0
+    positions = []
+    entities = []
+    if path.endswith(".jsonl.gz"):
+        f = _BlockWriter(path)
+        try:
+            normalizer = _Normalizer(f)
+            if index_key:
+                normalizer.on_entity = lambda table, entity_id, position: entities.append([table, entity_id, *position])
+            for record in records:
+                position = f.write(json.dumps({"record": normalizer.record(record)}) + "\n")
+                if index_key:
+                    positions.append([record.get(index_key), *position])
+                count += 1
+        finally:
+            f.close()
+        blocks = f.blocks
+    else:
+        blocks = None
+        # json.dumps escapes non-ASCII, so character counts are byte offsets.
+        offset = 0
+        with open(path, "w") as f:
+            if path.endswith(".jsonl"):
+                for record in records:
+                    line = json.dumps(record)
+                    f.write(line + "\n")
+                    positions.append([record.get(index_key), offset, len(line)])
+                    offset += len(line) + 1
+                    count += 1
+            else:
+                f.write("[")
+                offset += 1
+                for record in records:
+                    separator = ",\n" if count else "\n"
+                    text = json.dumps(record, indent=2)
+                    f.write(separator + text)
+                    positions.append([record.get(index_key), offset + len(separator), len(text)])
+                    offset += len(separator) + len(text)
+                    count += 1
+                f.write("\n]\n" if count else "]\n")
+    index_path = f"{path}.idx"
+    if index_key and all(position[0] is not None for position in positions):
+        index = {
+            "version": INDEX_VERSION,
+            "key": index_key,
+            "size": os.path.getsize(path),
+            "blocks": blocks,
+            "records": positions,
+            "entities": entities,
+        }
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, separators=(",", ":"))
+        os.replace(tmp_path, index_path)
+    elif os.path.exists(index_path):
+        # The data file was rewritten; an index of the old one would point at the wrong bytes.
+        os.remove(index_path)
+    return count
+
+
+class _IndexedEntities:
+    # Entity table of a normalized file that decodes entities on first use.
+    def __init__(self, index):
+        self.index = index
+
+    def __getitem__(self, key):
+        return self.index.entity(*key)
+
+
+class RecordIndex:
+    # Random access to an indexed backup file: the file is mmapped and only the
+    # records asked for are decoded. Safe to share between threads.
+    def __init__(self, path, index):
+        self.path = path
+        self.blocks = index["blocks"]
+        self.positions = {position[0]: position[1:] for position in index["records"]}
+        self.order = [position[0] for position in index["records"]]
+        self.entity_positions = {(table, entity_id): position for table, entity_id, *position in index["entities"]}
+        self.entities = {}
+        self.block_cache = {}
+        self.lock = threading.Lock()
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if index["size"] else None
+
+    @classmethod
+    def open(cls, path):
+        # None when the file has no index, or one that does not match it.
+        if path is None or not os.path.exists(f"{path}.idx"):
+            return None
+        try:
+            with open(f"{path}.idx") as f:
+                index = json.load(f)
+        except ValueError:
+            return None
+        if index.get("version") != INDEX_VERSION or index.get("size") != os.path.getsize(path):
+            return None
+        return cls(path, index)
+
+    def numbers(self):
+        # Keys in file order.
+        return list(self.order)
+
+    def __len__(self):
+        return len(self.order)
+
+    def _bytes(self, position):
+        if self.blocks is None:
+            offset, length = position
+            return self.map[offset:offset + length]
+        block, offset, length = position
+        with self.lock:
+            data = self.block_cache.get(block)
+        if data is None:
+            start, end = self.blocks[block]
+            # Raw inflate: every block starts at a full flush, with no back-references before it.
+            data = zlib.decompressobj(-zlib.MAX_WBITS).decompress(self.map[start:end])
+            with self.lock:
+                # A few blocks are enough for the in-order reads of several workers.
+                if len(self.block_cache) >= 8:
+                    self.block_cache.pop(next(iter(self.block_cache)))
+                self.block_cache[block] = data
+        return data[offset:offset + length]
+
+    def entity(self, table, entity_id):
+        key = (table, entity_id)
+        with self.lock:
+            if key in self.entities:
+                return self.entities[key]
+        value = _resolve(json.loads(self._bytes(self.entity_positions[key]))["value"], _IndexedEntities(self))
+        with self.lock:
+            self.entities[key] = value
+        return value
+
+    def get(self, number):
+        record = json.loads(self._bytes(self.positions[number]))
+        if self.blocks is None:
+            return record
+        return _resolve(record["record"], _IndexedEntities(self))
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
@@ -2,129 +2,375 @@
 import os
 import sys
 import json
-import requests
+import shutil
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 
-def get_paginated_data(url, headers, delay=0.2):
-    items = []
-    while url:
-        resp = requests.get(url, headers=headers)
-        if resp.status_code != 200:
-            print(f"Failed to fetch {url}: {resp.text}")
-            break
-        items.extend(resp.json())
-        url = resp.links.get('next', {}).get('url')
-        time.sleep(delay)
-    return items
-
-# --- Input Validation ---
-if len(sys.argv) != 4:
-    print("Usage: export_metadata.py <github_org> <repo_name> <backup_dir>")
-    sys.exit(1)
-
-org = sys.argv[1]
-repo = sys.argv[2]
-base_backup_dir = sys.argv[3]
-repo_backup_dir = os.path.join(base_backup_dir, repo)
-os.makedirs(repo_backup_dir, exist_ok=True)
-
-# --- Authentication ---
-GH_TOKEN = os.getenv("GH_TOKEN")
-if not GH_TOKEN:
-    print("GH_TOKEN not set")
-    sys.exit(1)
-
-headers = {"Authorization": f"Bearer {GH_TOKEN}"}
-
-print(f"\n🔁 Exporting metadata from GitHub repo: {org}/{repo}")
-
-# --- Export Issues (excluding PRs) ---
-print("📝 Exporting issues with comments and labels...")
-issues_url = f"https://api.github.com/repos/{org}/{repo}/issues?state=all&per_page=100"
-all_issues = []
-
-while issues_url:
-    resp = requests.get(issues_url, headers=headers)
-    if resp.status_code != 200:
-        print(f"Failed to fetch issues: {resp.text}")
-        break
-
-    page_issues = resp.json()
-    real_issues = [i for i in page_issues if "pull_request" not in i]
-
-    for issue in real_issues:
-        # Fetch comments
-        comments = get_paginated_data(issue["comments_url"], headers, delay=0.1)
-        issue["comments"] = comments
-
-    all_issues.extend(real_issues)
-    issues_url = resp.links.get('next', {}).get('url')
-    time.sleep(0.2)
-
-with open(f"{repo_backup_dir}/issues.json", "w") as f:
-    json.dump(all_issues, f, indent=2)
-print(f"✅ Exported {len(all_issues)} issues with comments.")
-
-# --- Export Pull Requests ---
-print("🔀 Exporting pull requests with comments, reviewers, files, and commits...")
-pulls_url = f"https://api.github.com/repos/{org}/{repo}/pulls?state=all&per_page=100"
-pull_requests = []
-
-while pulls_url:
-    resp = requests.get(pulls_url, headers=headers)
-    if resp.status_code != 200:
-        print(f"Failed to fetch pull requests: {resp.text}")
-        break
-
-    page_pulls = resp.json()
-
-    for pr in page_pulls:
-        pr_number = pr["number"]
-
-        # Issue comments
-        issue_comments_url = f"https://api.github.com/repos/{org}/{repo}/issues/{pr_number}/comments"
-        pr["comments"] = get_paginated_data(issue_comments_url, headers)
-
-        # Review comments
-        review_comments_url = f"https://api.github.com/repos/{org}/{repo}/pulls/{pr_number}/comments"
-        pr["review_comments"] = get_paginated_data(review_comments_url, headers)
-
-        # Reviewers
-        reviewers_url = f"https://api.github.com/repos/{org}/{repo}/pulls/{pr_number}/requested_reviewers"
-        r_resp = requests.get(reviewers_url, headers=headers)
-        pr["reviewers"] = r_resp.json().get("users", []) if r_resp.status_code == 200 else []
-
-        # Files changed
-        files_url = f"https://api.github.com/repos/{org}/{repo}/pulls/{pr_number}/files"
-        pr["files"] = get_paginated_data(files_url, headers)
-
-        # Commits in PR
-        commits_url = f"https://api.github.com/repos/{org}/{repo}/pulls/{pr_number}/commits"
-        pr["commits"] = get_paginated_data(commits_url, headers)
-
-        pull_requests.append(pr)
-
-    pulls_url = resp.links.get('next', {}).get('url')
-    time.sleep(0.2)
-
-with open(f"{repo_backup_dir}/pull_requests.json", "w") as f:
-    json.dump(pull_requests, f, indent=2)
-print(f"✅ Exported {len(pull_requests)} pull requests.")
-
-# --- Export Repo Labels ---
-print("🏷️ Exporting repository labels...")
-labels_url = f"https://api.github.com/repos/{org}/{repo}/labels?per_page=100"
-labels = get_paginated_data(labels_url, headers)
-with open(f"{repo_backup_dir}/labels.json", "w") as f:
-    json.dump(labels, f, indent=2)
-print(f"✅ Exported {len(labels)} labels.")
-
-# --- Export Milestones ---
-print("📅 Exporting milestones...")
-milestones_url = f"https://api.github.com/repos/{org}/{repo}/milestones?state=all&per_page=100"
-milestones = get_paginated_data(milestones_url, headers)
-with open(f"{repo_backup_dir}/milestones.json", "w") as f:
-    json.dump(milestones, f, indent=2)
-print(f"✅ Exported {len(milestones)} milestones.")
-
-print("\n🎉 Metadata export completed for", repo)
+from backup_io import FORMATS, find_records, read_records, write_records
+from git_mirror import GitMirror
+from graphql_export import GraphQLExporter
+from http_cache import ResponseCache
+from http_client import ApiClient, get_paginated_data, iter_pages
+from metrics import Metrics
+
+# Same variable GitHub Actions sets; point it at GitHub Enterprise or a local test server.
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
+def group_comments_by_number(comments, url_key):
+    # Repo-wide listings link each comment to its thread by URL, ending in the number.
+    grouped = {}
+    for comment in sorted(comments, key=lambda c: c["id"]):
+        number = int(comment[url_key].rstrip("/").rsplit("/", 1)[1])
+        grouped.setdefault(number, []).append(comment)
+    return grouped
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+def merge_by_key(previous, changed, key):
+    merged = {item[key]: item for item in previous}
+    merged.update((item[key], item) for item in changed)
+    return list(merged.values())
+
+def settings_from_env():
+    settings = {
+        # EXPORT_WORKERS > 1 fetches comments, reviewers, files and commits in parallel.
+        "workers": os.getenv("EXPORT_WORKERS", "1"),
+        # EXPORT_COMMENTS=repo pages the repo-wide comment listings once and joins them
+        # locally instead of fetching comments per issue and per PR.
+        "comments_mode": os.getenv("EXPORT_COMMENTS", "per-item"),
+        # EXPORT_BACKEND=graphql exports issues and PRs with their nested data through the GraphQL API.
+        "backend": os.getenv("EXPORT_BACKEND", "rest"),
+        # EXPORT_FORMAT=jsonl writes one record per line as pages arrive instead of a JSON array;
+        # jsonl.gz also stores repeated users, labels, milestones and repos once and compresses it.
+        "output_format": os.getenv("EXPORT_FORMAT", "json"),
+        # EXPORT_STATE_DIR keeps a per-repo cursor and the last snapshot across runs. With it set,
+        # only issues and PRs updated since the previous run are fetched and merged into the snapshot.
+        "state_dir": os.getenv("EXPORT_STATE_DIR"),
+        # EXPORT_MIRROR_DIR holds `git clone --mirror` copies (<repo>.git or <repo>). With the REST
+        # backend, PR files and commits are then computed from the mirror instead of the API.
+        "mirror_dir": os.getenv("EXPORT_MIRROR_DIR"),
+    }
+    try:
+        settings["workers"] = int(settings["workers"])
+    except ValueError:
+        print("EXPORT_WORKERS must be an integer")
+        sys.exit(1)
+    if settings["comments_mode"] not in ("per-item", "repo"):
+        print("EXPORT_COMMENTS must be 'per-item' or 'repo'")
+        sys.exit(1)
+    if settings["backend"] not in ("rest", "graphql"):
+        print("EXPORT_BACKEND must be 'rest' or 'graphql'")
+        sys.exit(1)
+    if settings["output_format"] not in FORMATS:
+        print("EXPORT_FORMAT must be 'json', 'jsonl' or 'jsonl.gz'")
+        sys.exit(1)
+    return settings
+
+def github_client(metrics=None):
+    # GH_TOKENS, a comma-separated list, spreads the API requests over several tokens so the
+    # export gets each one's rate limit; GH_TOKEN alone is a pool of one.
+    tokens = [t.strip() for t in os.getenv("GH_TOKENS", "").split(",") if t.strip()] or [os.getenv("GH_TOKEN")]
+    if not tokens[0]:
+        print("GH_TOKEN not set")
+        sys.exit(1)
+    # HTTP_CACHE_DIR enables conditional requests; 304 replies are served from the cache and are
+    # not counted against the rate limit. Entries are evicted by HTTP_CACHE_MAX_MB / HTTP_CACHE_MAX_DAYS.
+    cache = None
+    cache_dir = os.getenv("HTTP_CACHE_DIR")
+    if cache_dir:
+        cache = ResponseCache(
+            cache_dir,
+            max_bytes=int(os.getenv("HTTP_CACHE_MAX_MB", "1024")) << 20,
+            max_age=float(os.getenv("HTTP_CACHE_MAX_DAYS", "30")) * 24 * 3600,
+        )
+    # EXPORT_PAGE_WORKERS > 1 fetches the pages of long listings concurrently once the first
+    # page reports the last page number.
+    try:
+        page_workers = int(os.getenv("EXPORT_PAGE_WORKERS", "1"))
+    except ValueError:
+        print("EXPORT_PAGE_WORKERS must be an integer")
+        sys.exit(1)
+    if len(tokens) > 1:
+        print(f"🔑 Using a pool of {len(tokens)} GitHub tokens")
+    return ApiClient(
+        {}, cache=cache, metrics=metrics, page_workers=page_workers,
+        credentials=[{"Authorization": f"Bearer {token}"} for token in tokens],
+    )
+
+
+class RepoExporter:
+    # Exports one repository's issues, pull requests, labels and milestones into
+    # <base_backup_dir>/<repo>. The client and executor can be shared between repos.
+    def __init__(self, github, org, repo, base_backup_dir, settings, executor=None):
+        self.github = github
+        self.org = org
+        self.repo = repo
+        self.api_url = f"{GITHUB_API_URL}/repos/{org}/{repo}"
+        self.repo_backup_dir = os.path.join(base_backup_dir, repo)
+        self.executor = executor
+        self.comments_mode = settings["comments_mode"]
+        self.backend = settings["backend"]
+        self.output_format = settings["output_format"]
+        state_dir = settings["state_dir"]
+        self.repo_state_dir = os.path.join(state_dir, org, repo) if state_dir else None
+        self.cursor = load_json(os.path.join(self.repo_state_dir, "cursor.json"), {}) if self.repo_state_dir else {}
+        self.issue_comments = {}
+        self.review_comments = {}
+        self.mirror_dir = settings["mirror_dir"] if self.backend == "rest" else None
+        self.mirror = GitMirror.find(self.mirror_dir, org, repo) if self.mirror_dir else None
+        # Numbers of PRs whose files or commits were not in the mirror and came from the API.
+        self.mirror_misses = []
+
+    def phase(self, name):
+        return self.github.metrics.phase(name) if self.github.metrics else nullcontext()
+
+    def files_or_commits(self, kind, pr, url):
+        if self.mirror is not None:
+            result = getattr(self.mirror, kind)(pr)
+            if result is not None:
+                return result
+            self.mirror_misses.append(pr["number"])
+        return get_paginated_data(self.github, url)
+
+    def get_requested_reviewers(self, url):
+        r_resp = self.github.get(url)
+        return r_resp.json().get("users", []) if r_resp.status_code == 200 else []
+
+    def fill_sub_resources(self, items, jobs_for):
+        # Each job is (key, func, args); results are stored on the item in listing order,
+        # so the output is identical whether the jobs run sequentially or on the pool.
+        jobs = [(item, key, func, args) for item in items for key, func, args in jobs_for(item)]
+        if self.executor is None:
+            results = [func(*args) for _, _, func, args in jobs]
+        else:
+            results = list(self.executor.map(lambda job: job[2](*job[3]), jobs))
+        for (item, key, _, _), result in zip(jobs, results):
+            item[key] = result
+
+    def issue_jobs(self, issue):
+        if self.comments_mode == "repo" or issue.get("comments") == 0:
+            issue["comments"] = self.issue_comments.get(issue["number"], [])
+            return []
+        return [("comments", get_paginated_data, (self.github, issue["comments_url"]))]
+
+    def pr_jobs(self, pr):
+        pr_url = f"{self.api_url}/pulls/{pr['number']}"
+        jobs = []
+        if self.comments_mode == "repo":
+            pr["comments"] = self.issue_comments.get(pr["number"], [])
+            pr["review_comments"] = self.review_comments.get(pr["number"], [])
+        else:
+            jobs += [
+                # Issue comments
+                ("comments", get_paginated_data, (self.github, f"{self.api_url}/issues/{pr['number']}/comments")),
+                # Review comments
+                ("review_comments", get_paginated_data, (self.github, f"{pr_url}/comments")),
+            ]
+        return jobs + [
+            # Reviewers
+            ("reviewers", self.get_requested_reviewers, (f"{pr_url}/requested_reviewers",)),
+            # Files changed
+            ("files", self.files_or_commits, ("files", pr, f"{pr_url}/files")),
+            # Commits in PR
+            ("commits", self.files_or_commits, ("commits", pr, f"{pr_url}/commits")),
+        ]
+
+    def export_issues_rest(self, since=None):
+        issues_url = f"{self.api_url}/issues?state=all&per_page=100"
+        if since:
+            issues_url += f"&sort=updated&direction=asc&since={since}"
+        for resp in iter_pages(self.github, issues_url):
+            if resp.status_code != 200:
+                print(f"Failed to fetch issues: {resp.text}")
+                break
+
+            page_issues = resp.json()
+            real_issues = [i for i in page_issues if "pull_request" not in i]
+
+            # Fetch comments
+            self.fill_sub_resources(real_issues, self.issue_jobs)
+
+            yield from real_issues
+
+    def export_pull_requests_rest(self, since=None):
+        pulls_url = f"{self.api_url}/pulls?state=all&per_page=100"
+        if since:
+            # The pulls listing has no since filter; walk newest-updated first and stop at the cursor.
+            pulls_url += "&sort=updated&direction=desc"
+        # An incremental walk stops at the cursor, so pages past it are not fetched ahead.
+        for resp in iter_pages(self.github, pulls_url, parallel=not since):
+            if resp.status_code != 200:
+                print(f"Failed to fetch pull requests: {resp.text}")
+                break
+
+            page_pulls = resp.json()
+            reached_cursor = since and any(pr["updated_at"] < since for pr in page_pulls)
+            if reached_cursor:
+                page_pulls = [pr for pr in page_pulls if pr["updated_at"] >= since]
+
+            self.fill_sub_resources(page_pulls, self.pr_jobs)
+            yield from page_pulls
+            if reached_cursor:
+                break
+
+    def merge_snapshot(self, previous, changed):
+        # Streams the previous snapshot (newest number first, the REST listing order) and
+        # slots the changed items in, holding only the changed items in memory.
+        pending = sorted(changed, key=lambda i: i["number"], reverse=True)
+        changed_numbers = {item["number"]: item for item in changed}
+        for old in previous:
+            while pending and pending[0]["number"] > old["number"]:
+                yield pending.pop(0)
+            item = changed_numbers.get(old["number"])
+            if item is None:
+                yield old
+                continue
+            if self.backend == "rest" and self.comments_mode == "repo":
+                # Repo-wide comment listings were only fetched since the cursor.
+                for key in ("comments", "review_comments"):
+                    if key in item:
+                        item[key] = sorted(merge_by_key(old.get(key, []), item[key], "id"), key=lambda c: c["id"])
+            if pending and pending[0] is item:
+                yield pending.pop(0)
+        yield from pending
+
+    def track_updates(self, items, key):
+        # Advances the incremental cursor as records stream past.
+        for item in items:
+            if self.cursor.get(key) is None or item["updated_at"] > self.cursor[key]:
+                self.cursor[key] = item["updated_at"]
+            yield item
+
+    def output_path(self, name):
+        # Drop a copy in the other format left by an earlier run so readers never pick it up.
+        for fmt in FORMATS:
+            stale = os.path.join(self.repo_backup_dir, f"{name}.{fmt}")
+            for path in (stale, f"{stale}.idx"):
+                if fmt != self.output_format and os.path.exists(path):
+                    os.remove(path)
+        return os.path.join(self.repo_backup_dir, f"{name}.{self.output_format}")
+
+    def export_records(self, name, records, since):
+        if since:
+            changed = list(self.track_updates(records, name))
+            print(f"🔄 {len(changed)} {name.replace('_', ' ')} changed since last run.")
+            records = self.merge_snapshot(read_records(find_records(self.repo_state_dir, name)), changed)
+        else:
+            records = self.track_updates(records, name)
+        # Issues and PRs get a number -> offset index for the importer's random access.
+        return write_records(self.output_path(name), records, index_key="number")
+
+    def save_state(self):
+        # The cursor only advances after every file has been written.
+        os.makedirs(self.repo_state_dir, exist_ok=True)
+        for name in ("issues", "pull_requests"):
+            snapshot = f"{name}.{self.output_format}"
+            shutil.copyfile(os.path.join(self.repo_backup_dir, snapshot), os.path.join(self.repo_state_dir, snapshot))
+            for fmt in FORMATS:
+                stale = os.path.join(self.repo_state_dir, f"{name}.{fmt}")
+                if fmt != self.output_format and os.path.exists(stale):
+                    os.remove(stale)
+        with open(os.path.join(self.repo_state_dir, "cursor.json"), "w") as f:
+            json.dump(self.cursor, f, indent=2)
+        print(f"💾 Saved incremental state to {self.repo_state_dir}")
+
+    def run(self):
+        started = time.time()
+        org, repo = self.org, self.repo
+        os.makedirs(self.repo_backup_dir, exist_ok=True)
+        issues_since = self.cursor.get("issues")
+        pulls_since = self.cursor.get("pull_requests")
+
+        print(f"\n🔁 Exporting metadata from GitHub repo: {org}/{repo}")
+        if self.mirror is None and self.mirror_dir:
+            print(f"⚠️ No mirror of {repo} in {self.mirror_dir}, fetching PR files and commits from the API.")
+
+        graphql = GraphQLExporter(self.github, org, repo) if self.backend == "graphql" else None
+
+        if self.repo_state_dir and self.cursor:
+            print(f"⏩ Incremental export: issues since {issues_since}, pull requests since {pulls_since}")
+
+        if self.backend == "rest" and self.comments_mode == "repo":
+            print("💬 Exporting repository-wide issue and review comments...")
+            comments_since = min(filter(None, (issues_since, pulls_since)), default=None)
+            since_param = f"&since={comments_since}" if comments_since else ""
+            with self.phase("comments"):
+                self.issue_comments = group_comments_by_number(get_paginated_data(
+                    self.github, f"{self.api_url}/issues/comments?sort=created&direction=asc&per_page=100{since_param}"
+                ), "issue_url")
+                self.review_comments = group_comments_by_number(get_paginated_data(
+                    self.github, f"{self.api_url}/pulls/comments?sort=created&direction=asc&per_page=100{since_param}"
+                ), "pull_request_url")
+
+        # --- Export Issues (excluding PRs) ---
+        print("📝 Exporting issues with comments and labels...")
+        issues = graphql.export_issues(issues_since) if graphql else self.export_issues_rest(issues_since)
+        with self.phase("issues"):
+            issue_count = self.export_records("issues", issues, issues_since)
+        print(f"✅ Exported {issue_count} issues with comments.")
+
+        # --- Export Pull Requests ---
+        print("🔀 Exporting pull requests with comments, reviewers, files, and commits...")
+        pull_requests = graphql.export_pull_requests(pulls_since) if graphql else self.export_pull_requests_rest(pulls_since)
+        with self.phase("pull_requests"):
+            pr_count = self.export_records("pull_requests", pull_requests, pulls_since)
+        print(f"✅ Exported {pr_count} pull requests.")
+        if self.mirror is not None:
+            print(f"🪞 PR files and commits read from {self.mirror.path}; {len(set(self.mirror_misses))} PRs fell back to the API.")
+
+        if graphql:
+            print(f"📊 GraphQL: {graphql.requests} requests, {graphql.cost} points used, {graphql.remaining} remaining.")
+
+        # --- Export Repo Labels ---
+        print("🏷️ Exporting repository labels...")
+        with self.phase("labels"):
+            labels = get_paginated_data(self.github, f"{self.api_url}/labels?per_page=100")
+            write_records(self.output_path("labels"), labels)
+        print(f"✅ Exported {len(labels)} labels.")
+
+        # --- Export Milestones ---
+        print("📅 Exporting milestones...")
+        with self.phase("milestones"):
+            milestones = get_paginated_data(self.github, f"{self.api_url}/milestones?state=all&per_page=100")
+            write_records(self.output_path("milestones"), milestones)
+        print(f"✅ Exported {len(milestones)} milestones.")
+
+        # --- Save Incremental State ---
+        if self.repo_state_dir:
+            self.save_state()
+
+        print("\n🎉 Metadata export completed for", repo)
+        return {
+            "issues": issue_count,
+            "pull_requests": pr_count,
+            "labels": len(labels),
+            "milestones": len(milestones),
+            "seconds": round(time.time() - started, 1),
+        }
+
+
+if __name__ == "__main__":
+    # --- Input Validation ---
+    if len(sys.argv) != 4:
+        print("Usage: export_metadata.py <github_org> <repo_name> <backup_dir>")
+        sys.exit(1)
+
+    org = sys.argv[1]
+    repo = sys.argv[2]
+    base_backup_dir = sys.argv[3]
+
+    settings = settings_from_env()
+    metrics = Metrics("export_metadata")
+    github = github_client(metrics)
+    executor = ThreadPoolExecutor(max_workers=settings["workers"]) if settings["workers"] > 1 else None
+
+    RepoExporter(github, org, repo, base_backup_dir, settings, executor).run()
+
+    if executor is not None:
+        executor.shutdown()
+    metrics.finish()
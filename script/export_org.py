@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# Exports metadata for many repositories of a GitHub organization concurrently.
+#
+# Repos are taken from the comma-separated list, or listed from the org when
+# it is empty, and exported largest first on a bounded pool that shares one
+# rate-limited client. Output goes to <backup_dir>/metadata/<repo>, where
+# import_metadata.py reads it.
+import os
+import sys
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from export_metadata import GITHUB_API_URL, RepoExporter, github_client, settings_from_env
+from http_client import get_paginated_data
+from metrics import Metrics
+
+def list_repos(github, org, names):
+    if not names:
+        return get_paginated_data(github, f"{GITHUB_API_URL}/orgs/{org}/repos?type=all&per_page=100")
+    repos = []
+    for name in names:
+        resp = github.get(f"{GITHUB_API_URL}/repos/{org}/{quote(name)}")
+        if resp.status_code == 200:
+            repos.append(resp.json())
+        else:
+            print(f"❌ Repository {org}/{name} not found: {resp.status_code}")
+            repos.append({"name": name, "missing": True})
+    return repos
+
+def priority(repo):
+    # Biggest first, so the slowest exports start early instead of trailing at the end.
+    return (repo.get("open_issues_count", 0), repo.get("size", 0))
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        print("Usage: export_org.py <github_org> <comma_separated_repos_or_empty> <backup_dir>")
+        sys.exit(1)
+
+    org = sys.argv[1]
+    names = [name.strip() for name in sys.argv[2].split(",") if name.strip()]
+    backup_dir = sys.argv[3]
+    metadata_root = os.path.join(backup_dir, "metadata")
+
+    settings = settings_from_env()
+    try:
+        # EXPORT_REPO_WORKERS repos are exported at once.
+        repo_workers = int(os.getenv("EXPORT_REPO_WORKERS", "4"))
+    except ValueError:
+        print("EXPORT_REPO_WORKERS must be an integer")
+        sys.exit(1)
+
+    metrics = Metrics("export_org")
+    github = github_client(metrics)
+    repos = list_repos(github, org, names)
+    missing = [repo["name"] for repo in repos if repo.get("missing")]
+    queue = sorted((repo for repo in repos if not repo.get("missing")), key=priority, reverse=True)
+    print(f"📦 Exporting {len(queue)} repositories from {org} with {repo_workers} workers")
+
+    executor = ThreadPoolExecutor(max_workers=settings["workers"]) if settings["workers"] > 1 else None
+
+    def export(repo):
+        return RepoExporter(github, org, repo["name"], metadata_root, settings, executor).run()
+
+    summary = {name: {"status": "missing"} for name in missing}
+    with ThreadPoolExecutor(max_workers=repo_workers) as pool:
+        futures = [(repo["name"], pool.submit(export, repo)) for repo in queue]
+        for name, future in futures:
+            try:
+                summary[name] = {"status": "ok", **future.result()}
+            except Exception as e:
+                print(f"❌ Export of {org}/{name} failed: {e}")
+                summary[name] = {"status": "failed", "error": str(e)}
+
+    if executor is not None:
+        executor.shutdown()
+
+    # --- Summary ---
+    print(f"\n{'repo':<40} {'status':<8} {'issues':>7} {'PRs':>7} {'labels':>7} {'miles':>7} {'secs':>8}")
+    for name, result in sorted(summary.items()):
+        print(
+            f"{name:<40} {result['status']:<8} {result.get('issues', '-'):>7} {result.get('pull_requests', '-'):>7} "
+            f"{result.get('labels', '-'):>7} {result.get('milestones', '-'):>7} {result.get('seconds', '-'):>8}"
+        )
+    os.makedirs(backup_dir, exist_ok=True)
+    with open(os.path.join(backup_dir, "export_summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    metrics.finish()
+
+    failed = [name for name, result in summary.items() if result["status"] != "ok"]
+    if failed:
+        print(f"\n⚠️ {len(failed)} repositories were not exported: {', '.join(sorted(failed))}")
+        sys.exit(1)
+    print(f"\n🎉 Metadata export completed for {len(summary)} repositories")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# Pull request commits and changed files computed from a local mirror clone.
+#
+# A `git clone --mirror` of a GitHub repo carries refs/pull/<n>/head, so the
+# commit list and per-file stats of every PR can be produced offline, in the
+# REST shapes, instead of paging /pulls/<n>/commits and /pulls/<n>/files
+# (which GitHub caps at 250 commits and 3,000 files).
+import os
+import subprocess
+
+# git log -z separates commits with NUL; the fields of one commit are NUL separated too.
+LOG_FORMAT = "%H%x00%T%x00%P%x00%an%x00%ae%x00%ad%x00%cn%x00%ce%x00%cd%x00%B"
+LOG_FIELDS = 10
+FILE_STATUS = {"A": "added", "D": "removed", "M": "modified", "R": "renamed", "C": "copied", "T": "changed"}
+
+
+class GitMirror:
+    def __init__(self, path, org, repo):
+        self.path = path
+        self.html_url = f"https://github.com/{org}/{repo}"
+        # Dates are printed in UTC so they match the API's "Z" timestamps.
+        self.env = {**os.environ, "TZ": "UTC"}
+
+    @classmethod
+    def find(cls, mirror_dir, org, repo):
+        # export_github.sh clones to <repo>.git, import_metadata.py to <repo>.
+        for name in (f"{repo}.git", repo):
+            path = os.path.join(mirror_dir, name)
+            if os.path.isdir(path):
+                return cls(path, org, repo)
+        return None
+
+    def _git(self, *args):
+        result = subprocess.run(
+            ["git", "-C", self.path, *args],
+            env=self.env, capture_output=True, text=True, errors="replace",
+        )
+        return result.stdout if result.returncode == 0 else None
+
+    def _ranges(self, pr):
+        # The recorded SHAs first; refs/pull/<n>/head and the base branch if those are gone.
+        heads = [pr.get("head", {}).get("sha"), f"refs/pull/{pr['number']}/head"]
+        bases = [pr.get("base", {}).get("sha"), f"refs/heads/{pr.get('base', {}).get('ref', 'main')}"]
+        return [(base, head) for head in heads if head for base in bases if base]
+
+    def _first(self, pr, args_for):
+        # Output of the git command for the first base/head pair that resolves.
+        for base, head in self._ranges(pr):
+            output = self._git(*args_for(base, head))
+            if output is not None:
+                return output
+        return None
+
+    def commits(self, pr):
+        # Commits on head that are not on base, oldest first, like /pulls/<n>/commits.
+        output = self._first(pr, lambda base, head: [
+            "log", "-z", "--reverse", f"--format={LOG_FORMAT}", "--date=format-local:%Y-%m-%dT%H:%M:%SZ", f"{base}..{head}",
+        ])
+        if output is None:
+            return None
+        fields = output.split("\0")
+        commits = []
+        for start in range(0, len(fields) - LOG_FIELDS + 1, LOG_FIELDS):
+            sha, tree, parents, a_name, a_email, a_date, c_name, c_email, c_date, message = fields[start:start + LOG_FIELDS]
+            commits.append({
+                "sha": sha,
+                "commit": {
+                    "author": {"name": a_name, "email": a_email, "date": a_date},
+                    "committer": {"name": c_name, "email": c_email, "date": c_date},
+                    "message": message.rstrip("\n"),
+                    "tree": {"sha": tree},
+                },
+                # The GitHub accounts behind the commit are not known offline.
+                "author": None,
+                "committer": None,
+                "parents": [{"sha": parent} for parent in parents.split()],
+                "html_url": f"{self.html_url}/commit/{sha}",
+            })
+        return commits
+
+    def files(self, pr):
+        # Changes between the merge base and head, like /pulls/<n>/files (without patches).
+        output = self._first(pr, lambda base, head: ["diff", "--raw", "--no-abbrev", "--numstat", "-z", "-M", f"{base}...{head}"])
+        if output is None:
+            return None
+        tokens = output.split("\0")
+        files = []
+        stats = []
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token.startswith(":"):
+                # :old_mode new_mode old_sha new_sha status, then one path or, for renames and copies, two.
+                _, _, _, blob, status = token[1:].split(" ")
+                entry = {"sha": blob if blob.strip("0") else None, "status": FILE_STATUS.get(status[0], "modified")}
+                if status[0] in "RC":
+                    entry["filename"], entry["previous_filename"] = tokens[i + 2], tokens[i + 1]
+                    i += 3
+                else:
+                    entry["filename"] = tokens[i + 1]
+                    i += 2
+                files.append(entry)
+            elif token:
+                # added<TAB>deleted<TAB>path, with an empty path followed by old and new for renames.
+                added, deleted, path = token.split("\t", 2)
+                stats.append((added, deleted))
+                i += 1 if path else 3
+            else:
+                i += 1
+        # --numstat lists the files in the same order as --raw; binary files show "-".
+        for entry, (added, deleted) in zip(files, stats):
+            entry["additions"] = int(added) if added.isdigit() else 0
+            entry["deletions"] = int(deleted) if deleted.isdigit() else 0
+            entry["changes"] = entry["additions"] + entry["deletions"]
+        return files
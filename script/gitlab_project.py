@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# GitLab lookups shared by the importer and the dry-run planner.
+#
+# The plan is only right when both find the same group and recognise the same
+# already imported issues and merge requests, so both go through here.
+import re
+
+from http_client import get_paginated_data
+
+# Appended to the description of every imported issue ("issue") and merge request ("PR").
+IMPORT_MARKER = "Imported from GitHub {source} #{number}"
+
+
+def import_marker(source, number):
+    return IMPORT_MARKER.format(source=source, number=number)
+
+
+def find_group_path(client, api_url, group):
+    # Full path of the group, or None when GitLab finds no such group.
+    resp = client.get(f"{api_url}/groups?search={group}")
+    if resp.status_code != 200 or not resp.json():
+        return None
+    return resp.json()[0]["full_path"]
+
+
+def build_import_index(client, api_url, project_id, kind, source):
+    # Map GitHub number -> GitLab iid for everything already imported into the project.
+    marker = re.compile(re.escape(import_marker(source, "")) + r"(\d+)(?!\d)")
+    items = get_paginated_data(client, f"{api_url}/projects/{project_id}/{kind}?scope=all&per_page=100")
+    index = {}
+    for item in items:
+        match = marker.search(item.get("description") or "")
+        if match:
+            index[int(match.group(1))] = item["iid"]
+    return index
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# GitHub GraphQL export backend.
+#
+# Pulls issues and pull requests with their comments, labels, milestone,
+# assignees, review threads, files and commits in batched pages, and maps
+# them back to the REST shapes import_metadata.py reads.
+import json
+import os
+
+GRAPHQL_URL = os.getenv("GITHUB_GRAPHQL_URL", "https://api.github.com/graphql")
+ISSUE_PAGE_SIZE = 50
+PR_PAGE_SIZE = 20
+NESTED_PAGE_SIZE = 100
+
+PAGE_INFO = "pageInfo { hasNextPage endCursor }"
+COMMENT_FIELDS = f"databaseId body createdAt updatedAt url author {{ login }}"
+REVIEW_COMMENT_FIELDS = f"{COMMENT_FIELDS} path diffHunk line originalLine replyTo {{ databaseId }} commit {{ oid }}"
+REVIEW_THREAD_COMMENTS = f"nodes {{ {REVIEW_COMMENT_FIELDS} }}"
+
+# Connections that may need more than one page, with the node fields to fetch.
+ISSUE_CONNECTIONS = {
+    "comments": f"nodes {{ {COMMENT_FIELDS} }}",
+    "labels": "nodes { name color description }",
+    "assignees": "nodes { login }",
+}
+PR_CONNECTIONS = {
+    **ISSUE_CONNECTIONS,
+    "reviewThreads": f"nodes {{ id comments(first: {NESTED_PAGE_SIZE}) {{ {PAGE_INFO} {REVIEW_THREAD_COMMENTS} }} }}",
+    "reviewRequests": "nodes { requestedReviewer { ... on User { login } } }",
+    "files": "nodes { path additions deletions changeType }",
+    "commits": f"nodes {{ commit {{ oid message url author {{ name email date user {{ login }} }} }} }}",
+}
+
+COMMON_FIELDS = f"id number title body state createdAt updatedAt closedAt url author {{ login }} milestone {{ title number }}"
+PR_FIELDS = "merged mergedAt headRefName headRefOid baseRefName baseRefOid"
+RATE_LIMIT = "rateLimit { cost remaining resetAt }"
+
+
+class GraphQLExporter:
+    def __init__(self, client, org, repo):
+        self.client = client
+        self.org = org
+        self.repo = repo
+        self.requests = 0
+        self.cost = 0
+        self.remaining = None
+
+    def query(self, query, variables):
+        # Queries only read, so 5xx replies (common on heavy nested pages) are retried.
+        resp = self.client.post(GRAPHQL_URL, json={"query": query, "variables": variables}, idempotent=True)
+        self.requests += 1
+        if resp.status_code != 200:
+            raise RuntimeError(f"GraphQL request failed: {resp.status_code} {resp.text}")
+        payload = resp.json()
+        if payload.get("errors"):
+            raise RuntimeError(f"GraphQL errors: {payload['errors']}")
+        rate = payload["data"].get("rateLimit") or {}
+        self.cost += rate.get("cost", 0)
+        self.remaining = rate.get("remaining", self.remaining)
+        return payload["data"]
+
+    def _connections_query(self, connections):
+        return " ".join(
+            f"{name}(first: {NESTED_PAGE_SIZE}) {{ {PAGE_INFO} {fields} }}" for name, fields in connections.items()
+        )
+
+    def _list_nodes(self, kind, page_size, fields, connections, since=None):
+        order = "orderBy: {field: CREATED_AT, direction: DESC}"
+        if since and kind == "issues":
+            order = f"orderBy: {{field: UPDATED_AT, direction: ASC}}, filterBy: {{since: {json.dumps(since)}}}"
+        elif since:
+            # pullRequests has no since filter; walk newest-updated first and stop at the cursor.
+            order = "orderBy: {field: UPDATED_AT, direction: DESC}"
+        query = f"""
+        query($owner: String!, $name: String!, $after: String) {{
+          {RATE_LIMIT}
+          repository(owner: $owner, name: $name) {{
+            {kind}(first: {page_size}, after: $after, {order}) {{
+              {PAGE_INFO}
+              nodes {{ {fields} {self._connections_query(connections)} }}
+            }}
+          }}
+        }}"""
+        node_type = "Issue" if kind == "issues" else "PullRequest"
+        after = None
+        while True:
+            data = self.query(query, {"owner": self.org, "name": self.repo, "after": after})
+            page = data["repository"][kind]
+            for node in page["nodes"]:
+                if since and node["updatedAt"] < since:
+                    return
+                for name, node_fields in connections.items():
+                    self._complete_connection(node_type, node, name, node_fields)
+                # Long review threads continue past the first page of their comments.
+                for thread in node.get("reviewThreads", {}).get("nodes", []):
+                    self._complete_connection("PullRequestReviewThread", thread, "comments", REVIEW_THREAD_COMMENTS)
+                yield node
+            if not page["pageInfo"]["hasNextPage"]:
+                break
+            after = page["pageInfo"]["endCursor"]
+
+    def _complete_connection(self, node_type, node, name, fields):
+        # Follow up on nested connections that did not fit in the batched page.
+        connection = node[name]
+        query = f"""
+        query($id: ID!, $after: String) {{
+          {RATE_LIMIT}
+          node(id: $id) {{
+            ... on {node_type} {{ {name}(first: {NESTED_PAGE_SIZE}, after: $after) {{ {PAGE_INFO} {fields} }} }}
+          }}
+        }}"""
+        while connection["pageInfo"]["hasNextPage"]:
+            data = self.query(query, {"id": node["id"], "after": connection["pageInfo"]["endCursor"]})
+            more = data["node"][name]
+            connection["nodes"].extend(more["nodes"])
+            connection["pageInfo"] = more["pageInfo"]
+
+    def export_issues(self, since=None):
+        nodes = self._list_nodes("issues", ISSUE_PAGE_SIZE, COMMON_FIELDS, ISSUE_CONNECTIONS, since)
+        return (map_issue(node) for node in nodes)
+
+    def export_pull_requests(self, since=None):
+        fields = f"{COMMON_FIELDS} {PR_FIELDS}"
+        nodes = self._list_nodes("pullRequests", PR_PAGE_SIZE, fields, PR_CONNECTIONS, since)
+        return (map_pull_request(node) for node in nodes)
+
+
+# --- Mapping to REST shapes ---
+
+def _user(actor):
+    return {"login": actor["login"]} if actor else None
+
+
+def _comment(node):
+    return {
+        "id": node["databaseId"],
+        "body": node["body"],
+        "created_at": node["createdAt"],
+        "updated_at": node["updatedAt"],
+        "html_url": node["url"],
+        "user": _user(node["author"]),
+    }
+
+
+def _review_comment(node):
+    comment = _comment(node)
+    comment.update({
+        "path": node["path"],
+        "diff_hunk": node["diffHunk"],
+        "line": node["line"],
+        "original_line": node["originalLine"],
+        "in_reply_to_id": (node.get("replyTo") or {}).get("databaseId"),
+        "commit_id": (node.get("commit") or {}).get("oid"),
+    })
+    return comment
+
+
+def _common(node):
+    assignees = [_user(a) for a in node["assignees"]["nodes"]]
+    milestone = node.get("milestone")
+    return {
+        "number": node["number"],
+        "title": node["title"],
+        "body": node["body"],
+        "state": "open" if node["state"] == "OPEN" else "closed",
+        "created_at": node["createdAt"],
+        "updated_at": node["updatedAt"],
+        "closed_at": node["closedAt"],
+        "html_url": node["url"],
+        "user": _user(node["author"]),
+        "labels": node["labels"]["nodes"],
+        "milestone": {"title": milestone["title"], "number": milestone["number"]} if milestone else None,
+        "assignees": assignees,
+        "assignee": assignees[0] if assignees else None,
+        "comments": [_comment(c) for c in node["comments"]["nodes"]],
+    }
+
+
+def map_issue(node):
+    return _common(node)
+
+
+FILE_STATUS = {"ADDED": "added", "DELETED": "removed", "MODIFIED": "modified", "RENAMED": "renamed", "COPIED": "copied", "CHANGED": "changed"}
+
+
+def map_pull_request(node):
+    pr = _common(node)
+    pr.update({
+        "merged_at": node["mergedAt"],
+        "head": {"ref": node["headRefName"], "sha": node["headRefOid"]},
+        "base": {"ref": node["baseRefName"], "sha": node["baseRefOid"]},
+        "review_comments": sorted(
+            (_review_comment(c) for thread in node["reviewThreads"]["nodes"] for c in thread["comments"]["nodes"]),
+            key=lambda c: c["id"],
+        ),
+        "reviewers": [
+            _user(r["requestedReviewer"]) for r in node["reviewRequests"]["nodes"]
+            if r.get("requestedReviewer") and r["requestedReviewer"].get("login")
+        ],
+        "files": [
+            {
+                "filename": f["path"],
+                "additions": f["additions"],
+                "deletions": f["deletions"],
+                "changes": f["additions"] + f["deletions"],
+                "status": FILE_STATUS.get(f["changeType"], f["changeType"].lower()),
+            }
+            for f in node["files"]["nodes"]
+        ],
+        "commits": [
+            {
+                "sha": c["commit"]["oid"],
+                "html_url": c["commit"]["url"],
+                "commit": {
+                    "message": c["commit"]["message"],
+                    "author": {k: (c["commit"]["author"] or {}).get(k) for k in ("name", "email", "date")},
+                },
+                "author": _user((c["commit"]["author"] or {}).get("user")),
+            }
+            for c in node["commits"]["nodes"]
+        ],
+    })
+    return pr
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# On-disk cache of GET responses for conditional requests.
+#
+# Bodies are stored with their ETag / Last-Modified validators. ApiClient sends
+# them back as If-None-Match / If-Modified-Since and serves the cached body on
+# 304 Not Modified, which GitHub does not count against the rate limit.
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Response headers that callers rely on and are replayed on a cache hit.
+KEPT_HEADERS = ("Content-Type", "Link", "ETag", "Last-Modified")
+# Size-based eviction trims the cache this far below max_bytes, so a full cache is not
+# rescanned on every store.
+EVICT_TO = 0.9
+# Headers of a 304 that describe the current state rather than the stored body.
+FRESH_HEADERS = ("Link", "ETag", "Last-Modified")
+RATE_LIMIT_PREFIXES = ("x-ratelimit-", "ratelimit-")
+
+
+class ResponseCache:
+    def __init__(self, directory, max_bytes=1 << 30, max_age=30 * 24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        # Bytes on disk as of the last eviction plus everything stored since.
+        self.size = 0
+        self.lock = threading.Lock()
+        self.evicting = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.evict()
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        base = os.path.join(self.directory, key[:2], key)
+        return f"{base}.meta", f"{base}.body"
+
+    def _load(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta["url"] != url:
+                return None, None
+            return meta, body_path
+        except (OSError, ValueError, KeyError):
+            return None, None
+
+    def conditional_headers(self, url):
+        meta, body_path = self._load(url)
+        headers = {}
+        if meta is None or not os.path.exists(body_path):
+            return headers
+        if meta["headers"].get("ETag"):
+            headers["If-None-Match"] = meta["headers"]["ETag"]
+        if meta["headers"].get("Last-Modified"):
+            headers["If-Modified-Since"] = meta["headers"]["Last-Modified"]
+        return headers
+
+    def cached_response(self, url, not_modified=None):
+        # not_modified is the live 304: its Link (a listing may have grown new pages
+        # since the body was stored), validators and rate-limit headers win.
+        meta, body_path = self._load(url)
+        if meta is None:
+            return None
+        try:
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except OSError:
+            return None
+        # Touch the entry so size-based eviction drops the least recently used first.
+        now = time.time()
+        for path in self._paths(url):
+            os.utime(path, (now, now))
+        self.hits += 1
+        headers = CaseInsensitiveDict(meta["headers"])
+        if not_modified is not None:
+            fresh = {k: not_modified.headers[k] for k in FRESH_HEADERS if k in not_modified.headers}
+            if any(headers.get(k) != v for k, v in fresh.items()):
+                meta["headers"].update(fresh)
+                self._write(self._paths(url)[0], json.dumps(meta), "w")
+            headers.update(fresh)
+            headers.update({k: v for k, v in not_modified.headers.items() if k.lower().startswith(RATE_LIMIT_PREFIXES)})
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = body
+        resp.headers = headers
+        resp.url = url
+        resp.encoding = "utf-8"
+        resp.from_cache = True
+        return resp
+
+    def store(self, url, resp):
+        if resp.status_code != 200 or not (resp.headers.get("ETag") or resp.headers.get("Last-Modified")):
+            return
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        meta = {"url": url, "headers": {k: resp.headers[k] for k in KEPT_HEADERS if k in resp.headers}}
+        written = 0
+        for path, data, mode in ((body_path, resp.content, "wb"), (meta_path, json.dumps(meta), "w")):
+            written += self._write(path, data, mode)
+        with self.lock:
+            self.size += written
+            over = self.size > self.max_bytes
+        if over:
+            self.evict()
+
+    def _write(self, path, data, mode):
+        # A temp file of its own per write: page workers of one process store concurrently.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, mode) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+
+    def evict(self):
+        # Drop entries older than max_age, then the least recently used until under max_bytes.
+        # Runs at startup and whenever stores take the cache over max_bytes; a store that finds
+        # another thread evicting leaves it to that one.
+        if not self.evicting.acquire(blocking=False):
+            return
+        try:
+            entries = []
+            now = time.time()
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                        if now - stat.st_mtime > self.max_age:
+                            os.remove(path)
+                        elif not name.endswith(".tmp"):
+                            # Temp files still being written are only removed once stale.
+                            entries.append((stat.st_mtime, stat.st_size, path))
+                    except OSError:
+                        continue
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes * EVICT_TO:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+            with self.lock:
+                self.size = total
+        finally:
+            self.evicting.release()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# Shared HTTP client for the GitHub export and GitLab import scripts.
+#
+# One pooled requests.Session per API, paced by the rate-limit headers the
+# server sends back instead of fixed sleeps, with retries on 429/5xx. A client
+# can spread its requests over a pool of tokens, each with its own budget.
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Only retry POSTs the server refused outright; a 5xx may already have created the object.
+POST_RETRY_STATUSES = {429}
+# Connect and read timeouts of every request, so a hung connection cannot stall a worker forever.
+TIMEOUT = (10, 120)
+
+
+def _never_sent(error):
+    # True when the connection failed before any of the request reached the server.
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+def _parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _Credential:
+    # One token's rate-limit state. A client without a token pool has a single credential
+    # whose auth header lives in the session headers.
+    def __init__(self, number, headers=None):
+        self.number = number
+        self.headers = headers or {}
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self.blocked_until = 0.0
+        self.next_slot = 0.0
+
+
+class ApiClient:
+    def __init__(self, headers, pool_size=32, max_retries=5, backoff=1.0, low_water=50, write_rate=None, cache=None, metrics=None, page_workers=1, credentials=None, timeout=TIMEOUT):
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        # Below this many remaining requests, spread the rest evenly until the reset.
+        self.low_water = low_water
+        self.lock = threading.Lock()
+        # Per-request auth headers, one dict per token in the pool; requests go to whichever
+        # token can send soonest, and exhausted tokens sit out until their reset.
+        self.credentials = [_Credential(i + 1, h) for i, h in enumerate(credentials or [{}])]
+        # Server errors back off the whole client, whichever token got them.
+        self.blocked_until = 0.0
+        # Optional cap on non-GET requests per second, shared by every thread using this client.
+        self.write_interval = 1.0 / write_rate if write_rate else 0.0
+        self.next_write = 0.0
+        # Optional http_cache.ResponseCache used for conditional GETs.
+        self.cache = cache
+        # Optional metrics.Metrics that every HTTP exchange is reported to.
+        self.metrics = metrics
+        # Pages of a listing fetched at once by iter_pages; a separate pool so page fetches
+        # issued from other pools' workers can never wait on themselves.
+        self.page_workers = page_workers
+        self.page_executor = ThreadPoolExecutor(max_workers=page_workers) if page_workers > 1 else None
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def request(self, method, url, idempotent=False, **kwargs):
+        # idempotent=True marks a POST that only reads, such as a GraphQL query, as safe to repeat.
+        idempotent = idempotent or method != "POST"
+        retry_statuses = RETRY_STATUSES if idempotent else POST_RETRY_STATUSES
+        use_cache = self.cache is not None and method == "GET"
+        kwargs.setdefault("timeout", self.timeout)
+        if use_cache:
+            kwargs["headers"] = {**self.cache.conditional_headers(url), **kwargs.get("headers", {})}
+        for attempt in range(self.max_retries + 1):
+            if hasattr(kwargs.get("data"), "seek"):
+                # A streamed body was consumed by the previous attempt.
+                kwargs["data"].seek(0)
+            credential = self._acquire()
+            if method != "GET" and self.write_interval:
+                self._pace_writes()
+            started = time.time()
+            try:
+                resp = self.session.request(method, url, **{**kwargs, "headers": {**credential.headers, **kwargs.get("headers", {})}})
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # A POST that may have reached the server is not re-sent: it could create the object twice.
+                retried = attempt < self.max_retries and (idempotent or _never_sent(e))
+                if self.metrics:
+                    self.metrics.observe(method, url, time.time() - started, retried=retried)
+                if not retried:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+
+            remaining = self._update_limits(resp, credential)
+            rate_limited = resp.status_code == 429 or self._is_rate_limited(resp)
+            retry = attempt < self.max_retries and (resp.status_code in retry_statuses or rate_limited)
+            if self.metrics:
+                self.metrics.observe(method, url, time.time() - started, resp, retried=retry, remaining=remaining)
+            if use_cache and resp.status_code == 304:
+                cached = self.cache.cached_response(url, resp)
+                if cached is not None:
+                    return cached
+                # The entry was evicted after the validators were sent; fetch the full body.
+                kwargs["headers"] = {k: v for k, v in kwargs["headers"].items() if not k.startswith("If-")}
+                continue
+            if use_cache:
+                self.cache.store(url, resp)
+            if retry:
+                wait = _parse_retry_after(resp.headers.get("Retry-After"))
+                if wait is None:
+                    wait = self.backoff * 2 ** attempt
+                print(f"⏳ {resp.status_code} from {url}, retrying in {wait:.1f}s")
+                # Hands a streamed response's connection back to the pool.
+                resp.close()
+                with self.lock:
+                    # A rate limit only benches the token that hit it; the rest of the pool carries on.
+                    holder = credential if rate_limited else self
+                    holder.blocked_until = max(holder.blocked_until, time.time() + wait)
+                continue
+            return resp
+        return resp
+
+    def _is_rate_limited(self, resp):
+        # GitHub reports primary and secondary rate limits as 403.
+        if resp.status_code != 403:
+            return False
+        return "Retry-After" in resp.headers or resp.headers.get("X-RateLimit-Remaining") == "0"
+
+    def _update_limits(self, resp, credential):
+        remaining = resp.headers.get("X-RateLimit-Remaining", resp.headers.get("RateLimit-Remaining"))
+        reset = resp.headers.get("X-RateLimit-Reset", resp.headers.get("RateLimit-Reset"))
+        limit = resp.headers.get("X-RateLimit-Limit", resp.headers.get("RateLimit-Limit"))
+        if remaining is None:
+            return None
+        with self.lock:
+            try:
+                credential.limit = int(limit) if limit else credential.limit
+                credential.remaining = int(remaining)
+                credential.reset_at = float(reset) if reset else None
+            except ValueError:
+                return None
+            if credential.remaining <= 0 and credential.reset_at and credential.blocked_until < credential.reset_at:
+                credential.blocked_until = credential.reset_at + 1
+                if len(self.credentials) > 1:
+                    resets = time.strftime("%H:%M:%S", time.localtime(credential.reset_at))
+                    print(f"🔑 Token {credential.number} of {len(self.credentials)} exhausted until {resets}")
+            return credential.remaining
+
+    def _acquire(self):
+        # Picks the credential that can send soonest, the one with the most budget left on a tie,
+        # and waits until it may. Below low_water a token's remaining requests are spread evenly
+        # until its reset.
+        with self.lock:
+            now = time.time()
+            best = None
+            for credential in self.credentials:
+                ready = max(now, self.blocked_until, credential.blocked_until)
+                paced = credential.remaining is not None and credential.reset_at and 0 < credential.remaining < self.low_water
+                if paced:
+                    ready = max(ready, credential.next_slot)
+                budget = float("inf") if credential.remaining is None else credential.remaining
+                if best is None or (ready, -budget) < best[0]:
+                    best = ((ready, -budget), credential, paced)
+            (ready, _), credential, paced = best
+            if paced:
+                credential.next_slot = ready + max(0.0, credential.reset_at - now) / credential.remaining
+            if credential.remaining is not None:
+                # Spent now so concurrent threads spread over the pool before the response tells.
+                credential.remaining -= 1
+        wait = ready - now
+        if wait > 0:
+            if wait > 5:
+                print(f"⏳ Rate limit reached, sleeping {wait:.0f}s")
+            time.sleep(wait)
+        return credential
+
+    def _pace_writes(self):
+        with self.lock:
+            now = time.time()
+            slot = max(now, self.next_write)
+            self.next_write = slot + self.write_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _page_number(url):
+    if not url:
+        return None
+    page = dict(parse_qsl(urlsplit(url).query)).get("page")
+    return int(page) if page and page.isdigit() else None
+
+
+def _with_page(url, page):
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query["page"] = str(page)
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def iter_pages(client, url, parallel=True):
+    # Yields the response of every page in order, stopping after the first that is not a 200.
+    # When the first page links rel="last" with a page number, the remaining pages are fetched
+    # page_workers at a time; otherwise rel="next" is followed one page at a time. Pages past
+    # that "last" (a stale Link, or a listing that grew meanwhile) are then followed by rel="next".
+    resp = client.get(url)
+    yield resp
+    if resp.status_code != 200:
+        return
+    next_url = resp.links.get("next", {}).get("url")
+    next_page = _page_number(next_url)
+    last_page = _page_number(resp.links.get("last", {}).get("url"))
+
+    if parallel and client.page_executor is not None and next_page is not None and last_page is not None:
+        resp = yield from _fan_out(client, resp, next_url, range(next_page, last_page + 1))
+        if resp.status_code != 200:
+            return
+        next_url = resp.links.get("next", {}).get("url")
+    while next_url:
+        resp = client.get(next_url)
+        yield resp
+        if resp.status_code != 200:
+            return
+        next_url = resp.links.get("next", {}).get("url")
+
+
+def _fan_out(client, resp, url, page_numbers):
+    # Yields the given pages in order and returns the last response yielded, or resp if none was.
+    pages = iter(page_numbers)
+    pending = deque()
+    try:
+        while True:
+            # Keep a bounded window in flight so a slow consumer does not buffer the whole listing.
+            while len(pending) < 2 * client.page_workers:
+                page = next(pages, None)
+                if page is None:
+                    break
+                pending.append(client.page_executor.submit(client.get, _with_page(url, page)))
+            if not pending:
+                return resp
+            resp = pending.popleft().result()
+            yield resp
+            if resp.status_code != 200:
+                return resp
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def count_items(client, url):
+    # Size of a listing in one request: asked for with per_page=1, its last page number is the count.
+    resp = client.get(url)
+    if resp.status_code != 200:
+        return None
+    last_page = _page_number(resp.links.get("last", {}).get("url"))
+    return last_page if last_page is not None else len(resp.json())
+
+
+def get_paginated_data(client, url):
+    items = []
+    for resp in iter_pages(client, url):
+        if resp.status_code != 200:
+            print(f"Failed to fetch {resp.url}: {resp.text}")
+            break
+        items.extend(resp.json())
+    return items
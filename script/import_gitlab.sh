@@ -4,9 +4,11 @@ set -e
 GL_GROUP="$1"
 GL_HOST="$2"
 BACKUP_DIR="$3"
+# Optional comma-separated list of repos to import; empty imports every mirror in the backup.
+REPOS_INPUT="$4"
 
 if [ -z "$GL_GROUP" ] || [ -z "$GL_HOST" ] || [ -z "$BACKUP_DIR" ]; then
-  echo "Usage: import_gitlab.sh <gitlab_group> <gitlab_host> <backup_dir>"
+  echo "Usage: import_gitlab.sh <gitlab_group> <gitlab_host> <backup_dir> [comma_separated_repos]"
   exit 1
 fi
 
@@ -22,8 +24,17 @@ fi
 
 echo "Importing repositories from: $BACKUP_DIR/repos"
 
+# The token reaches git through environment config scoped to the GitLab host, so it is never
+# written into a mirror's config (the backup, or a persistent mirror cache).
+export GIT_CONFIG_COUNT=1
+export GIT_CONFIG_KEY_0="http.https://$GL_HOST/.extraHeader"
+export GIT_CONFIG_VALUE_0="Authorization: Basic $(printf 'oauth2:%s' "$GL_TOKEN" | base64 -w0)"
+
 for repo_path in "$BACKUP_DIR/repos"/*.git; do
   repo_name=$(basename "$repo_path" .git)
+  if [ -n "$REPOS_INPUT" ] && [[ ",$REPOS_INPUT," != *",$repo_name,"* ]]; then
+    continue
+  fi
   echo "Processing repository: $repo_name"
 
   # Create project on GitLab (ignore if it already exists)
@@ -48,12 +59,36 @@ create_response=$(curl -s -o /dev/null -w "%{http_code}" -X POST "https://$GL_HO
     echo "ℹ️ Project $repo_name may already exist or failed to create (HTTP $create_response)"
   fi
 
-  # Push repo to GitLab
-  gitlab_url="https://oauth2:$GL_TOKEN@$GL_HOST/$GL_GROUP/$repo_name.git"
+  # Push repo to GitLab. The push goes to a separate "gitlab" remote so origin keeps pointing
+  # at GitHub and a cached mirror can be fetched again on the next run.
+  gitlab_url="https://$GL_HOST/$GL_GROUP/$repo_name.git"
+  git -C "$repo_path" remote set-url gitlab "$gitlab_url" 2>/dev/null || git -C "$repo_path" remote add gitlab "$gitlab_url"
+
+  # The refs pushed last time to this project are kept next to the mirror, or the cached mirror
+  # it was copied from; only refs that changed since are pushed. A new project or a first push
+  # gets the full mirror.
+  state_dir=$(git -C "$repo_path" config migrate.cacheMirror || true)
+  [ -n "$state_dir" ] && [ -d "$state_dir" ] || state_dir="$repo_path"
+  state_file="$state_dir/pushed-refs-$(printf '%s' "$GL_HOST/$GL_GROUP/$repo_name" | sha1sum | cut -c1-12)"
+  current_refs=$(mktemp)
+  git -C "$repo_path" for-each-ref --format='%(objectname) %(refname)' | LC_ALL=C sort > "$current_refs"
 
-  echo "Pushing $repo_name to GitLab..."
-  git -C "$repo_path" remote set-url origin "$gitlab_url" || git -C "$repo_path" remote add origin "$gitlab_url"
-  git -C "$repo_path" push --mirror origin
+  if [ "$create_response" != "201" ] && [ -f "$state_file" ]; then
+    refspecs=$(
+      LC_ALL=C comm -13 "$state_file" "$current_refs" | awk '{print "+" $2 ":" $2}'
+      LC_ALL=C comm -23 <(awk '{print $2}' "$state_file" | LC_ALL=C sort) <(awk '{print $2}' "$current_refs" | LC_ALL=C sort) | awk '{print ":" $1}'
+    )
+    if [ -z "$refspecs" ]; then
+      echo "No ref changes in $repo_name since the last push"
+    else
+      echo "Pushing $(echo "$refspecs" | wc -l) changed refs of $repo_name to GitLab..."
+      echo "$refspecs" | xargs -n 500 git -C "$repo_path" push gitlab
+    fi
+  else
+    echo "Pushing $repo_name to GitLab..."
+    git -C "$repo_path" push --mirror gitlab
+  fi
+  mv "$current_refs" "$state_file"
 
   echo "✅ Finished importing $repo_name"
 done
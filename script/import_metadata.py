@@ -1,10 +1,20 @@
 #!/usr/bin/env python3
+import base64
+import math
 import os
+import subprocess
 import sys
-import json
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote
 
+from attachments import AttachmentStore, AttachmentUploader
+from backup_io import RecordIndex, find_records, read_records, records_fingerprint
+from gitlab_project import build_import_index, find_group_path, import_marker
+from http_client import ApiClient, get_paginated_data
+from journal import ImportJournal
+from metrics import Metrics
+from user_map import resolver_from_env
+
 if len(sys.argv) != 5:
     print("Usage: import_metadata.py <gitlab_group> <gitlab_host> <github_org> <backup_dir>")
     sys.exit(1)
@@ -19,167 +29,361 @@ gitlab_group = sys.argv[1]
 gitlab_host = sys.argv[2]
 github_org = sys.argv[3]
 backup_dir = sys.argv[4]
+# GITLAB_SCHEME=http talks to a plain-HTTP instance, such as a local test server.
+gitlab_scheme = os.getenv("GITLAB_SCHEME", "https")
+gitlab_api = f"{gitlab_scheme}://{gitlab_host}/api/v4"
+# git pushes get the token through environment config scoped to the GitLab host, so it is
+# never written into a mirror's config.
+os.environ.update({
+    "GIT_CONFIG_COUNT": "1",
+    "GIT_CONFIG_KEY_0": f"http.{gitlab_scheme}://{gitlab_host}/.extraHeader",
+    "GIT_CONFIG_VALUE_0": "Authorization: Basic " + base64.b64encode(f"oauth2:{GL_TOKEN}".encode()).decode(),
+})
+
+# --- Concurrency ---
+# IMPORT_WORKERS repos are imported at once. IMPORT_WRITE_RATE caps POST/PUT requests per
+# second across all workers.
+try:
+    import_workers = int(os.getenv("IMPORT_WORKERS", "1"))
+    write_rate = float(os.getenv("IMPORT_WRITE_RATE", "0"))
+    # IMPORT_PUSH_CHUNK is the number of MR branches sent per git push.
+    push_chunk = int(os.getenv("IMPORT_PUSH_CHUNK", "200"))
+    # IMPORT_PAGE_WORKERS > 1 fetches the pages of long GitLab listings concurrently.
+    page_workers = int(os.getenv("IMPORT_PAGE_WORKERS", "1"))
+    # IMPORT_ITEM_WORKERS > 1 splits a repo's issues, and then its PRs, into that many disjoint
+    # ranges imported at once. Needs the backup's .idx files; GitLab iids then no longer follow
+    # the backup order.
+    item_workers = int(os.getenv("IMPORT_ITEM_WORKERS", "1"))
+except ValueError:
+    print("IMPORT_WORKERS, IMPORT_WRITE_RATE, IMPORT_PUSH_CHUNK, IMPORT_PAGE_WORKERS "
+          "and IMPORT_ITEM_WORKERS must be numbers")
+    sys.exit(1)
+
+metrics = Metrics("import_metadata")
+gitlab = ApiClient(
+    {"PRIVATE-TOKEN": GL_TOKEN},
+    pool_size=max(32, import_workers * item_workers),
+    write_rate=write_rate or None,
+    metrics=metrics,
+    page_workers=page_workers,
+)
+
+def post_notes(project_id, kind, iid, comments, skip=(), on_posted=None, rewrite=None):
+    # Posted one at a time, oldest first: GitLab only honours created_at for admin and group or
+    # project owner tokens, and otherwise orders notes by when they were posted.
+    url = f"{gitlab_api}/projects/{project_id}/{kind}/{iid}/notes"
+    notes = [
+        (index, {"body": rewrite(comment.get("body", "")) if rewrite else comment.get("body", ""), "created_at": comment.get("created_at")})
+        for index, comment in enumerate(sorted(comments, key=lambda c: c.get("created_at") or ""))
+        if index not in skip
+    ]
+
+    def post(indexed_note):
+        index, note = indexed_note
+        r_note = gitlab.post(url, json=note)
+        if r_note.status_code == 201 and on_posted:
+            on_posted(index)
+        return r_note.status_code == 201
+
+    return all([post(note) for note in notes])
+
+def finish_item(journal, project_id, kind, item, iid, attachments=None):
+    # Post whatever notes and close the journal has not recorded yet, then mark the item done.
+    number = item["number"]
+    entry = journal.get(kind, number)
+    complete = post_notes(
+        project_id, kind, iid, item.get("comments", []),
+        skip=entry["notes"],
+        on_posted=lambda index: journal.record("note", kind, number, index=index),
+        rewrite=attachments.rewrite if attachments else None,
+    )
+    if item.get("state") == "closed" and not entry["closed"]:
+        r_close = gitlab.put(
+            f"{gitlab_api}/projects/{project_id}/{kind}/{iid}",
+            json={"state_event": "close"}
+        )
+        if r_close.status_code == 200:
+            journal.record("closed", kind, number)
+        else:
+            complete = False
+    if complete:
+        journal.record("done", kind, number)
+    return complete
+
+def for_each_record(path, kind, journal, handle):
+    # Calls handle on each record of a backup file and returns whether all succeeded. With a
+    # sidecar index, records the journal marks done are never decoded, and the rest can be split
+    # into IMPORT_ITEM_WORKERS ranges that each decode only their own records from the mmap.
+    index = RecordIndex.open(path)
+    if index is None:
+        return all([handle(record) for record in read_records(path)])
+    try:
+        numbers = [number for number in index.numbers() if not (journal.get(kind, number) or {}).get("done")]
+        if item_workers <= 1 or len(numbers) < 2:
+            return all([handle(index.get(number)) for number in numbers])
+        size = math.ceil(len(numbers) / item_workers)
+        ranges = [numbers[start:start + size] for start in range(0, len(numbers), size)]
+        with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+            return all(list(pool.map(lambda numbers: all([handle(index.get(n)) for n in numbers]), ranges)))
+    finally:
+        index.close()
+
+def sync_labels(project_id, repo_path):
+    # Create the exported labels the project does not have yet, with their colors and descriptions.
+    url = f"{gitlab_api}/projects/{project_id}/labels"
+    existing = {label["name"] for label in get_paginated_data(gitlab, f"{url}?per_page=100")}
+    missing = [label for label in read_records(find_records(repo_path, "labels")) if label["name"] not in existing]
+    print(f" Creating {len(missing)} labels ({len(existing)} already in the project)")
+    complete = True
+    for label in missing:
+        r = gitlab.post(url, json={
+            "name": label["name"],
+            "color": f"#{label.get('color') or '428bca'}",
+            "description": label.get("description") or "",
+        })
+        # 409: created concurrently or by an earlier, interrupted run.
+        if r.status_code not in (201, 409):
+            print(f" Failed to create label {label['name']}: {r.status_code}: {r.text}")
+            complete = False
+    return complete
+
+def sync_milestones(project_id, repo_path):
+    # Create the exported milestones the project does not have yet and return the full title -> id map.
+    url = f"{gitlab_api}/projects/{project_id}/milestones"
+    milestone_map = {m["title"]: m["id"] for m in get_paginated_data(gitlab, f"{url}?per_page=100")}
+    missing = [m for m in read_records(find_records(repo_path, "milestones")) if m["title"] not in milestone_map]
+    print(f" Creating {len(missing)} milestones ({len(milestone_map)} already in the project)")
+    complete = True
+    for milestone in missing:
+        data = {"title": milestone["title"], "description": milestone.get("description") or ""}
+        if milestone.get("due_on"):
+            data["due_date"] = milestone["due_on"][:10]
+        r = gitlab.post(url, json=data)
+        if r.status_code != 201:
+            print(f" Failed to create milestone {milestone['title']}: {r.status_code}: {r.text}")
+            complete = False
+            continue
+        milestone_id = r.json()["id"]
+        milestone_map[milestone["title"]] = milestone_id
+        if milestone.get("state") == "closed":
+            gitlab.put(f"{url}/{milestone_id}", json={"state_event": "close"})
+    return milestone_map, complete
 
-headers = {"PRIVATE-TOKEN": GL_TOKEN}
+def git(local_repo_path, *args, stdin=None):
+    return subprocess.run(["git", "-C", local_repo_path, *args], input=stdin, text=True).returncode
 
-def get_group_path(group):
-    url = f"https://{gitlab_host}/api/v4/groups?search={group}"
-    r = requests.get(url, headers=headers)
-    if r.status_code != 200 or not r.json():
-        print("Group not found.")
-        sys.exit(1)
-    return r.json()[0]["full_path"]
+def push_pr_refs(local_repo_path, prs, pending):
+    # Push the source and target branch of every pending MR that GitLab lacks straight from
+    # the recorded SHAs, in a few multi-refspec pushes; the mirror, which is the backup and
+    # possibly the mirror cache, is not touched. Names are assigned over all PRs so a rerun
+    # picks the same ones. Returns {pr number: (source_branch, target_branch)} and whether
+    # every push succeeded.
+    listing = subprocess.run(
+        ["git", "-C", local_repo_path, "for-each-ref", "--format=%(refname:strip=2) %(objectname)", "refs/heads"],
+        capture_output=True, text=True,
+    )
+    existing = dict(line.rsplit(" ", 1) for line in listing.stdout.splitlines())
+    sides = [
+        (pr["number"], pr.get("state") == "open", [(pr.get(side, {}).get("ref", "main"), pr.get(side, {}).get("sha")) for side in ("head", "base")])
+        for pr in prs
+    ]
+    created = {}
+    branches = {}
+    refspecs = []
+    # Open PRs claim a branch name first, then the newest, as the backup lists newest first.
+    for number, _, ((source, head_sha), (target, base_sha)) in sorted(sides, key=lambda entry: not entry[1]):
+        owner = existing.get(source) or created.get(source)
+        if head_sha and owner and owner != head_sha:
+            # The name is another commit's: a reused branch name, or a fork PR from its main.
+            source = f"github-pr-{number}"
+        for ref, sha in ((source, head_sha), (target, base_sha)):
+            # An existing branch keeps its commit; a target that moved on is still the right target.
+            if sha and ref not in existing and ref not in created:
+                created[ref] = sha
+                if number in pending:
+                    refspecs.append(f"{sha}:refs/heads/{ref}")
+        branches[number] = (source, target)
+    if not refspecs:
+        return branches, True
 
-group_path = get_group_path(gitlab_group)
+    # Pushed to the URL rather than the remote, which would record remote-tracking refs in the mirror.
+    url = subprocess.run(["git", "-C", local_repo_path, "remote", "get-url", "gitlab"], capture_output=True, text=True).stdout.strip()
+    print(f" Pushing {len(refspecs)} merge request branches in chunks of {push_chunk}")
+    pushed = True
+    for start in range(0, len(refspecs), push_chunk):
+        if git(local_repo_path, "push", url, *refspecs[start:start + push_chunk]) != 0:
+            print(f" Failed to push merge request branches {start + 1}-{start + len(refspecs[start:start + push_chunk])}")
+            pushed = False
+    return branches, pushed
+
+group_path = find_group_path(gitlab, gitlab_api, gitlab_group)
+if group_path is None:
+    print("Group not found.")
+    sys.exit(1)
 
 metadata_root = os.path.join(backup_dir, "metadata")
 if not os.path.exists(metadata_root):
     print(f"No metadata to import in: {metadata_root}")
     sys.exit(0)
+# Files mirrored by attachments.py, if that stage ran for this backup.
+attachment_store = AttachmentStore.open(os.path.join(backup_dir, "attachments"))
 
-for repo in os.listdir(metadata_root):
-    repo_path = os.path.join(metadata_root, repo)
-    if not os.path.isdir(repo_path):
-        continue
+# IMPORT_REPOS limits the import to a comma-separated list of repos.
+selected_repos = {name.strip() for name in os.getenv("IMPORT_REPOS", "").split(",") if name.strip()}
+repos = sorted(
+    repo for repo in os.listdir(metadata_root)
+    if os.path.isdir(os.path.join(metadata_root, repo)) and (not selected_repos or repo in selected_repos)
+)
+
+# --- User Resolution ---
+users = resolver_from_env(gitlab, gitlab_api, gitlab_host)
+
+def backup_logins():
+    for repo in repos:
+        repo_path = os.path.join(metadata_root, repo)
+        for issue in read_records(find_records(repo_path, "issues")):
+            if "pull_request" not in issue:
+                yield from (assignee["login"] for assignee in issue.get("assignees") or [])
+        for pr in read_records(find_records(repo_path, "pull_requests")):
+            if pr.get("assignee"):
+                yield pr["assignee"]["login"]
 
+with metrics.phase("users"):
+    users.prefetch(backup_logins())
+    users.save()
+
+def import_repo(repo):
+    # Each repo keeps an append-only journal of import steps next to its backup files.
+    journal = ImportJournal(os.path.join(metadata_root, repo, "import_journal.jsonl"))
+    fingerprint = records_fingerprint(os.path.join(metadata_root, repo))
+    try:
+        if journal.is_complete(fingerprint):
+            print(f"\n Metadata for {group_path}/{repo} already imported, skipping")
+            return
+        if import_repo_items(repo, journal):
+            journal.record("complete", fingerprint=fingerprint)
+    finally:
+        journal.close()
+
+def import_repo_items(repo, journal):
+    repo_path = os.path.join(metadata_root, repo)
     print(f"\n Importing metadata to {group_path}/{repo}")
     encoded_path = quote(f"{group_path}/{repo}", safe="")
-    project_url = f"https://{gitlab_host}/api/v4/projects/{encoded_path}"
-    resp = requests.get(project_url, headers=headers)
+    project_url = f"{gitlab_api}/projects/{encoded_path}"
+    resp = gitlab.get(project_url)
     if resp.status_code != 200:
         print(f" Project {group_path}/{repo} not found.")
-        continue
+        return False
 
     project_id = resp.json()["id"]
+    # Links to mirrored attachments are pointed at uploads to this project.
+    attachments = AttachmentUploader(gitlab, f"{gitlab_api}/projects/{project_id}", attachment_store, journal)
 
-    milestone_map = {}
-    r = requests.get(f"https://{gitlab_host}/api/v4/projects/{project_id}/milestones", headers=headers)
-    if r.status_code == 200:
-        milestone_map = {m["title"]: m["id"] for m in r.json()}
+    with metrics.phase("labels"):
+        complete = sync_labels(project_id, repo_path)
+    with metrics.phase("milestones"):
+        milestone_map, milestones_synced = sync_milestones(project_id, repo_path)
+        complete &= milestones_synced
+
+    imported_issues = build_import_index(gitlab, gitlab_api, project_id, "issues", "issue")
+    imported_mrs = build_import_index(gitlab, gitlab_api, project_id, "merge_requests", "PR")
+    print(f" Found {len(imported_issues)} issues and {len(imported_mrs)} merge requests already imported")
 
     # ----- Import Issues -----
-    issues_file = os.path.join(repo_path, "issues.json")
-    if os.path.exists(issues_file):
-        with open(issues_file, "r") as f:
-            issues = json.load(f)
-
-        for issue in issues:
-            if "pull_request" in issue:
-                continue
-
-            github_issue_ref = f"Imported from GitHub issue #{issue['number']}"
-            assignees = []
-            for assignee in issue.get("assignees", []):
-                username = assignee["login"]
-                user_search = requests.get(f"https://{gitlab_host}/api/v4/users?username={username}", headers=headers)
-                if user_search.status_code == 200 and user_search.json():
-                    user_id = user_search.json()[0]["id"]
-                    assignees.append(user_id)
-                else:
-                    print(f" Assignee '{username}' not found in GitLab")
-            print(f" Assigning issue to GitLab user IDs: {assignees}")
-
-            search_url = f"https://{gitlab_host}/api/v4/projects/{project_id}/issues?search={quote(str(issue['number']))}"
-            search_resp = requests.get(search_url, headers=headers)
-            if search_resp.status_code == 200:
-                existing_issue = next((i for i in search_resp.json() if github_issue_ref in i.get("description", "")), None)
-                if existing_issue:
-                    print(f"Issue already exists: {issue['title']}")
-                    if assignees:
-                        update_resp = requests.put(
-                            f"https://{gitlab_host}/api/v4/projects/{project_id}/issues/{existing_issue['iid']}",
-                            headers=headers,
-                            json={"assignee_ids": assignees}
-                        )
-                    continue
-
-            labels = [label["name"] for label in issue.get("labels", [])]
-            milestone_title = issue.get("milestone", {}).get("title")
-            milestone_id = milestone_map.get(milestone_title)
-
-            if milestone_title and milestone_id is None:
-                r_milestone = requests.post(
-                    f"https://{gitlab_host}/api/v4/projects/{project_id}/milestones",
-                    headers=headers,
-                    json={"title": milestone_title}
-                )
-                if r_milestone.status_code == 201:
-                    milestone_id = r_milestone.json()["id"]
-                    milestone_map[milestone_title] = milestone_id
+    def import_issue(issue):
+        if "pull_request" in issue:
+            return True
 
-            description = issue.get("body", "") + f"\n\n_{github_issue_ref}_"
-            data = {
-                "title": issue["title"],
-                "description": description,
-                "created_at": issue["created_at"],
-                "labels": labels
-            }
-            if milestone_id:
-                data["milestone_id"] = milestone_id
+        entry = journal.get("issues", issue["number"])
+        if entry and entry["done"]:
+            return True
+        if entry and entry["iid"]:
+            print(f" Resuming issue: {issue['title']}")
+            return finish_item(journal, project_id, "issues", issue, entry["iid"], attachments)
+
+        github_issue_ref = import_marker("issue", issue["number"])
+        assignees = users.resolve_many(assignee["login"] for assignee in issue.get("assignees", []))
+        print(f" Assigning issue to GitLab user IDs: {assignees}")
+
+        existing_iid = imported_issues.get(issue["number"])
+        if existing_iid:
+            print(f"Issue already exists: {issue['title']}")
             if assignees:
-                data["assignee_ids"] = assignees
-
-            r = requests.post(f"https://{gitlab_host}/api/v4/projects/{project_id}/issues", headers=headers, json=data)
-            if r.status_code == 201:
-                issue_id = r.json()["iid"]
-                print(f" Issue created: {data['title']}")
-                for comment in issue.get("comments", []):
-                    note_data = {
-                        "body": comment.get("body", ""),
-                        "created_at": comment.get("created_at"),
-                    }
-                    r_note = requests.post(
-                        f"https://{gitlab_host}/api/v4/projects/{project_id}/issues/{issue_id}/notes",
-                        headers=headers,
-                        json=note_data
-                    )
-                if issue.get("state") == "closed":
-                    requests.put(
-                        f"https://{gitlab_host}/api/v4/projects/{project_id}/issues/{issue_id}",
-                        headers=headers,
-                        json={"state_event": "close"}
-                    )
-
-    pr_file = os.path.join(repo_path, "pull_requests.json")
-    if os.path.exists(pr_file):
-        with open(pr_file, "r") as f:
-            pull_requests = json.load(f)
+                update_resp = gitlab.put(
+                    f"{gitlab_api}/projects/{project_id}/issues/{existing_iid}",
+                    json={"assignee_ids": assignees}
+                )
+            return True
+
+        labels = [label["name"] for label in issue.get("labels", [])]
+        milestone_id = milestone_map.get((issue.get("milestone") or {}).get("title"))
+
+        description = attachments.rewrite(issue.get("body", "")) + f"\n\n_{github_issue_ref}_"
+        data = {
+            "title": issue["title"],
+            "description": description,
+            "created_at": issue["created_at"],
+            "labels": labels
+        }
+        if milestone_id:
+            data["milestone_id"] = milestone_id
+        if assignees:
+            data["assignee_ids"] = assignees
+
+        r = gitlab.post(f"{gitlab_api}/projects/{project_id}/issues", json=data)
+        if r.status_code != 201:
+            return False
+        issue_id = r.json()["iid"]
+        imported_issues[issue["number"]] = issue_id
+        journal.record("created", "issues", issue["number"], iid=issue_id)
+        print(f" Issue created: {data['title']}")
+        return finish_item(journal, project_id, "issues", issue, issue_id, attachments)
+
+    with metrics.phase("issues"):
+        complete &= for_each_record(find_records(repo_path, "issues"), "issues", journal, import_issue)
 
+    pr_file = find_records(repo_path, "pull_requests")
+    if pr_file:
+        # export_github.sh leaves <repo>.git behind; a mirror cloned below is <repo>.
         local_repo_path = os.path.join(backup_dir, "repos", repo)
-        if not os.path.exists(local_repo_path):
-            print(f" Cloning missing repo: {repo}")
-            os.makedirs(os.path.join(backup_dir, "repos"), exist_ok=True)
-            clone_url = f"https://github.com/{github_org}/{repo}.git"
-            result = os.system(f"git clone --mirror {clone_url} {local_repo_path}")
-            if result != 0:
-                print(f" Failed to clone GitHub repo {repo}, skipping MRs.")
-                continue
-
-            os.system(f"git -C {local_repo_path} config --global --add safe.directory {os.path.abspath(local_repo_path)}")
-            gitlab_url = f"https://oauth2:{GL_TOKEN}@{gitlab_host}/{group_path}/{repo}.git"
-            os.system(f"git -C {local_repo_path} remote add gitlab {gitlab_url}")
-            os.system(f"git -C {local_repo_path} push --mirror gitlab")
-
-        for pr in pull_requests:
-            github_pr_ref = f"Imported from GitHub PR #{pr['number']}"
-            search_url = f"https://{gitlab_host}/api/v4/projects/{project_id}/merge_requests?search={quote(str(pr['number']))}"
-            search_resp = requests.get(search_url, headers=headers)
-            if search_resp.status_code == 200:
-                if any(github_pr_ref in mr.get("description", "") for mr in search_resp.json()):
-                    print(f" Merge Request already exists: {pr['title']}")
-                    continue
-
-            source_branch = pr.get("head", {}).get("ref", "main")
-            source_sha = pr.get("head", {}).get("sha")
-            target_branch = pr.get("base", {}).get("ref", "main")
-            target_sha = pr.get("base", {}).get("sha")
-
-            os.system(f"git -C {local_repo_path} branch -f {source_branch} {source_sha}")
-            os.system(f"git -C {local_repo_path} branch -f {target_branch} {target_sha}")
-            os.system(f"git -C {local_repo_path} push gitlab {source_branch}:{source_branch}")
-            os.system(f"git -C {local_repo_path} push gitlab {target_branch}:{target_branch}")
-
-            description = pr.get("body", "") + f"\n\n_{github_pr_ref}_"
+        if os.path.exists(f"{local_repo_path}.git"):
+            local_repo_path = f"{local_repo_path}.git"
+        with metrics.phase("git"):
+            if not os.path.exists(local_repo_path):
+                print(f" Cloning missing repo: {repo}")
+                os.makedirs(os.path.join(backup_dir, "repos"), exist_ok=True)
+                clone_url = f"https://github.com/{github_org}/{repo}.git"
+                result = os.system(f"git clone --mirror {clone_url} {local_repo_path}")
+                if result != 0:
+                    print(f" Failed to clone GitHub repo {repo}, skipping MRs.")
+                    return False
+
+                os.system(f"git -C {local_repo_path} config --global --add safe.directory {os.path.abspath(local_repo_path)}")
+                gitlab_url = f"{gitlab_scheme}://{gitlab_host}/{group_path}/{repo}.git"
+                os.system(f"git -C {local_repo_path} remote add gitlab {gitlab_url}")
+                os.system(f"git -C {local_repo_path} push --mirror gitlab")
+
+            branches, pushed = push_pr_refs(
+                local_repo_path, read_records(pr_file), {pr["number"] for pr in read_records(pr_file)} - set(imported_mrs),
+            )
+            complete &= pushed
+
+        def import_merge_request(pr):
+            entry = journal.get("merge_requests", pr["number"])
+            if entry and entry["done"]:
+                return True
+            if entry and entry["iid"]:
+                print(f" Resuming merge request: {pr['title']}")
+                return finish_item(journal, project_id, "merge_requests", pr, entry["iid"], attachments)
+
+            github_pr_ref = import_marker("PR", pr["number"])
+            if pr["number"] in imported_mrs:
+                print(f" Merge Request already exists: {pr['title']}")
+                return True
+
+            source_branch, target_branch = branches[pr["number"]]
+
+            description = attachments.rewrite(pr.get("body", "")) + f"\n\n_{github_pr_ref}_"
             data = {
                 "title": pr["title"],
                 "description": description,
@@ -190,38 +394,36 @@ for repo in os.listdir(metadata_root):
                 "allow_collaboration": True
             }
 
-            assignees = []
             assignee = pr.get("assignee")
             if assignee:
-                username = assignee["login"]
-                user_search = requests.get(f"https://{gitlab_host}/api/v4/users?search={username}", headers=headers)
-                if user_search.status_code == 200:
-                    matched_user = next((u for u in user_search.json() if u.get("username") == username), None)
-                    if matched_user:
-                        user_id = matched_user["id"]
-                        assignees.append(user_id)
+                assignees = users.resolve_many([assignee["login"]])
                 if assignees:
                     data["assignee_ids"] = assignees
 
-            r = requests.post(f"https://{gitlab_host}/api/v4/projects/{project_id}/merge_requests", headers=headers, json=data)
-            if r.status_code == 201:
-                mr_iid = r.json()["iid"]
-                print(f" Merge Request created: {pr['title']}")
-                for comment in pr.get("comments", []):
-                    note_data = {
-                        "body": comment.get("body", ""),
-                        "created_at": comment.get("created_at"),
-                    }
-                    r_note = requests.post(
-                        f"https://{gitlab_host}/api/v4/projects/{project_id}/merge_requests/{mr_iid}/notes",
-                        headers=headers,
-                        json=note_data
-                    )
-                if pr.get("state") == "closed":
-                    requests.put(
-                        f"https://{gitlab_host}/api/v4/projects/{project_id}/merge_requests/{mr_iid}",
-                        headers=headers,
-                        json={"state_event": "close"}
-                    )
-            else:
+            r = gitlab.post(f"{gitlab_api}/projects/{project_id}/merge_requests", json=data)
+            if r.status_code != 201:
                 print(f" Failed to create MR for: {pr['title']} — {r.status_code}: {r.text}")
+                return False
+            mr_iid = r.json()["iid"]
+            imported_mrs[pr["number"]] = mr_iid
+            journal.record("created", "merge_requests", pr["number"], iid=mr_iid)
+            print(f" Merge Request created: {pr['title']}")
+            return finish_item(journal, project_id, "merge_requests", pr, mr_iid, attachments)
+
+        with metrics.phase("merge_requests"):
+            complete &= for_each_record(pr_file, "merge_requests", journal, import_merge_request)
+
+    return complete
+
+if import_workers > 1:
+    with ThreadPoolExecutor(max_workers=import_workers) as pool:
+        for repo, future in [(repo, pool.submit(import_repo, repo)) for repo in repos]:
+            try:
+                future.result()
+            except Exception as e:
+                print(f" Import of {repo} failed: {e}")
+else:
+    for repo in repos:
+        import_repo(repo)
+
+metrics.finish()
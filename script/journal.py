@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# Append-only JSONL journal of import steps.
+#
+# Every step the importer completes for an item (created, each note posted,
+# closed, done) is appended as one line, so a restarted import can skip
+# finished items without API calls and finish half-imported ones exactly.
+import json
+import os
+import threading
+
+
+class ImportJournal:
+    def __init__(self, path, readonly=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.items = {}
+        # Attachment SHA-256 -> GitLab upload URL, so each file is uploaded to the project once.
+        self.uploads = {}
+        self.complete = False
+        # Fingerprint of the record files the completed import read, see backup_io.records_fingerprint.
+        self.fingerprint = None
+        intact = 0
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # A crash can leave a torn last line; everything before it is intact.
+                        break
+                    intact += len(line)
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._apply(entry)
+        # A read-only journal only reports progress, as the dry-run planner does.
+        self.file = None if readonly else open(path, "a")
+        if self.file is not None and self.file.tell() > intact:
+            # Drop the torn line, or the next record would be appended onto it and lost.
+            self.file.truncate(intact)
+
+    def _apply(self, entry):
+        if entry["step"] == "complete":
+            self.complete = True
+            self.fingerprint = entry.get("fingerprint")
+            return
+        if entry["step"] == "upload":
+            self.uploads[entry["sha256"]] = entry["url"]
+            return
+        item = self.items.setdefault((entry["kind"], entry["number"]), {"iid": None, "notes": set(), "closed": False, "done": False})
+        if entry["step"] == "created":
+            item["iid"] = entry["iid"]
+        elif entry["step"] == "note":
+            item["notes"].add(entry["index"])
+        elif entry["step"] == "closed":
+            item["closed"] = True
+        elif entry["step"] == "done":
+            item["done"] = True
+
+    def is_complete(self, fingerprint):
+        # A complete import of record files that have since been re-exported is not.
+        return self.complete and self.fingerprint == fingerprint
+
+    def get(self, kind, number):
+        with self.lock:
+            return self.items.get((kind, number))
+
+    def uploaded(self, sha256):
+        with self.lock:
+            return self.uploads.get(sha256)
+
+    def record(self, step, kind=None, number=None, **fields):
+        entry = {"step": step, "kind": kind, "number": number, **fields}
+        with self.lock:
+            self.file.write(json.dumps(entry) + "\n")
+            self.file.flush()
+            self._apply(entry)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
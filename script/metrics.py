@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# Request and phase metrics for the export and import scripts.
+#
+# ApiClient reports every HTTP exchange here, grouped by endpoint template
+# (ids and names replaced by placeholders). Scripts time their phases with
+# Metrics.phase(). finish() prints a per-endpoint table and writes a JSON
+# summary (METRICS_FILE) and a Prometheus textfile (METRICS_PROM_FILE).
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# Upper bounds, in seconds, of the request latency histogram buckets.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+TEMPLATE_RULES = [
+    (re.compile(r"/repos/[^/]+/[^/]+"), "/repos/:owner/:repo"),
+    (re.compile(r"/orgs/[^/]+"), "/orgs/:org"),
+    (re.compile(r"/projects/[^/]+"), "/projects/:project"),
+    (re.compile(r"/\d+(?=/|$)"), "/:number"),
+]
+
+
+def endpoint_template(url):
+    path = urlsplit(url).path.rstrip("/") or "/"
+    for pattern, replacement in TEMPLATE_RULES:
+        path = pattern.sub(replacement, path)
+    return path
+
+
+class Metrics:
+    def __init__(self, name):
+        self.name = name
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.phases = {}
+
+    def _endpoint(self, method, url):
+        key = (method, endpoint_template(url))
+        endpoint = self.endpoints.get(key)
+        if endpoint is None:
+            endpoint = self.endpoints[key] = {
+                "requests": 0,
+                "errors": 0,
+                "retries": 0,
+                "not_modified": 0,
+                "statuses": {},
+                "bytes_sent": 0,
+                "bytes_received": 0,
+                "seconds": 0.0,
+                "buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+                "min_remaining": None,
+            }
+        return endpoint
+
+    def observe(self, method, url, seconds, resp=None, retried=False, remaining=None):
+        # One HTTP exchange; resp is None when the connection failed.
+        with self.lock:
+            endpoint = self._endpoint(method, url)
+            endpoint["requests"] += 1
+            endpoint["seconds"] += seconds
+            bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+            endpoint["buckets"][bucket] += 1
+            if retried:
+                endpoint["retries"] += 1
+            if resp is None:
+                endpoint["errors"] += 1
+                return
+            status = str(resp.status_code)
+            endpoint["statuses"][status] = endpoint["statuses"].get(status, 0) + 1
+            if resp.status_code == 304:
+                endpoint["not_modified"] += 1
+            body = resp.request.body if resp.request is not None else None
+            endpoint["bytes_sent"] += len(body) if body else 0
+            endpoint["bytes_received"] += len(resp.content)
+            if remaining is not None and (endpoint["min_remaining"] is None or remaining < endpoint["min_remaining"]):
+                endpoint["min_remaining"] = remaining
+
+    @contextmanager
+    def phase(self, name):
+        # Phases that run several times, or on several threads at once, add up.
+        started = time.time()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.phases[name] = self.phases.get(name, 0.0) + time.time() - started
+
+    def summary(self):
+        with self.lock:
+            endpoints = []
+            for (method, template), endpoint in sorted(self.endpoints.items(), key=lambda e: e[0][1]):
+                histogram = {f"le_{bound}": count for bound, count in zip(LATENCY_BUCKETS, endpoint["buckets"])}
+                histogram["le_inf"] = endpoint["buckets"][-1]
+                endpoints.append({
+                    "method": method,
+                    "endpoint": template,
+                    **{k: v for k, v in endpoint.items() if k != "buckets"},
+                    "seconds": round(endpoint["seconds"], 3),
+                    "latency_histogram": histogram,
+                })
+            remaining = [e["min_remaining"] for e in endpoints if e["min_remaining"] is not None]
+            return {
+                "script": self.name,
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started)),
+                "seconds": round(time.time() - self.started, 3),
+                "requests": sum(e["requests"] for e in endpoints),
+                "retries": sum(e["retries"] for e in endpoints),
+                "min_remaining": min(remaining, default=None),
+                "phases": {name: round(seconds, 3) for name, seconds in self.phases.items()},
+                "endpoints": endpoints,
+            }
+
+    def prometheus(self, summary):
+        lines = []
+
+        def sample(name, labels, value):
+            label_text = ",".join(f'{k}="{v}"' for k, v in {"script": self.name, **labels}.items())
+            lines.append(f"action_hero_{name}{{{label_text}}} {value}")
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP action_hero_{name} {help_text}")
+            lines.append(f"# TYPE action_hero_{name} {kind}")
+            for labels, value in samples:
+                sample(name, labels, value)
+
+        endpoints = [({"method": e["method"], "endpoint": e["endpoint"]}, e) for e in summary["endpoints"]]
+        for name, key, help_text in (
+            ("http_requests_total", "requests", "HTTP requests sent."),
+            ("http_retries_total", "retries", "HTTP requests that were retried."),
+            ("http_errors_total", "errors", "HTTP requests that failed to connect."),
+            ("http_sent_bytes_total", "bytes_sent", "Request body bytes sent."),
+            ("http_received_bytes_total", "bytes_received", "Response body bytes received."),
+        ):
+            metric(name, "counter", help_text, [(labels, e[key]) for labels, e in endpoints])
+        metric(
+            "ratelimit_remaining_min", "gauge", "Lowest rate-limit remaining seen.",
+            [(labels, e["min_remaining"]) for labels, e in endpoints if e["min_remaining"] is not None],
+        )
+
+        metric("http_request_duration_seconds", "histogram", "HTTP request latency.", [])
+        for labels, e in endpoints:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, e["latency_histogram"].values()):
+                cumulative += count
+                sample("http_request_duration_seconds_bucket", {**labels, "le": str(bound)}, cumulative)
+            sample("http_request_duration_seconds_bucket", {**labels, "le": "+Inf"}, e["requests"])
+            sample("http_request_duration_seconds_sum", labels, e["seconds"])
+            sample("http_request_duration_seconds_count", labels, e["requests"])
+
+        metric("phase_seconds", "gauge", "Time spent per phase.", [({"phase": p}, s) for p, s in summary["phases"].items()])
+        metric("run_seconds", "gauge", "Wall time of the run.", [({}, summary["seconds"])])
+        metric("run_finished_timestamp_seconds", "gauge", "When the run ended.", [({}, round(time.time()))])
+        return "\n".join(lines) + "\n"
+
+    def finish(self):
+        summary = self.summary()
+        print(f"\n📊 {summary['requests']} requests ({summary['retries']} retried) in {summary['seconds']:.1f}s")
+        print(f"{'endpoint':<60} {'count':>7} {'avg ms':>8} {'retries':>7} {'KiB in':>9} {'min left':>8}")
+        for e in summary["endpoints"]:
+            average = 1000 * e["seconds"] / e["requests"] if e["requests"] else 0
+            remaining = "-" if e["min_remaining"] is None else e["min_remaining"]
+            print(
+                f"{e['method'] + ' ' + e['endpoint']:<60} {e['requests']:>7} {average:>8.0f} {e['retries']:>7} "
+                f"{e['bytes_received'] // 1024:>9} {remaining:>8}"
+            )
+        if summary["phases"]:
+            print("⏱️ Phases: " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in summary["phases"].items()))
+
+        # METRICS_FILE receives the JSON summary; METRICS_PROM_FILE a node_exporter textfile.
+        for path, content in (
+            (os.getenv("METRICS_FILE"), lambda: json.dumps(summary, indent=2)),
+            (os.getenv("METRICS_PROM_FILE"), lambda: self.prometheus(summary)),
+        ):
+            if not path:
+                continue
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(content())
+            os.replace(tmp_path, path)
+            print(f"📄 Metrics written to {path}")
+        return summary
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# Pipelined GitHub -> GitLab migration of an organization's repositories.
+#
+# Export workers clone each repo and export its metadata, then hand it to the
+# import workers through a bounded queue; those push the code and import the
+# metadata. While one repo is being imported into GitLab the next ones are
+# being exported from GitHub, so both APIs are busy at the same time. The
+# queue bound keeps the export side from running far ahead of the import.
+import os
+import sys
+import json
+import queue
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from attachments import AttachmentStore, download_client, mirror_attachments, scan_repo
+from export_metadata import RepoExporter, github_client, settings_from_env
+from export_org import list_repos, priority
+from metrics import Metrics
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def run(*args, env=None):
+    return subprocess.run(args, env=env).returncode
+
+if __name__ == "__main__":
+    if len(sys.argv) != 6:
+        print("Usage: migrate.py <github_org> <comma_separated_repos_or_empty> <gitlab_group> <gitlab_host> <backup_dir>")
+        sys.exit(1)
+
+    org = sys.argv[1]
+    names = [name.strip() for name in sys.argv[2].split(",") if name.strip()]
+    gitlab_group = sys.argv[3]
+    gitlab_host = sys.argv[4]
+    backup_dir = sys.argv[5]
+    metadata_root = os.path.join(backup_dir, "metadata")
+
+    settings = settings_from_env()
+    # PR files and commits come from the mirrors this driver clones, unless pointed elsewhere.
+    settings["mirror_dir"] = settings["mirror_dir"] or os.path.join(backup_dir, "repos")
+    try:
+        # MIGRATE_EXPORT_WORKERS repos are exported and MIGRATE_IMPORT_WORKERS imported at once;
+        # at most MIGRATE_QUEUE_SIZE exported repos wait for an import worker.
+        export_workers = int(os.getenv("MIGRATE_EXPORT_WORKERS", "1"))
+        import_workers = int(os.getenv("MIGRATE_IMPORT_WORKERS", "1"))
+        queue_size = int(os.getenv("MIGRATE_QUEUE_SIZE", "2"))
+        # ATTACHMENT_WORKERS files attached to issues and PRs are downloaded at once.
+        attachment_workers = int(os.getenv("ATTACHMENT_WORKERS", "8"))
+    except ValueError:
+        print("MIGRATE_EXPORT_WORKERS, MIGRATE_IMPORT_WORKERS, MIGRATE_QUEUE_SIZE and ATTACHMENT_WORKERS must be integers")
+        sys.exit(1)
+
+    metrics = Metrics("migrate")
+    github = github_client(metrics)
+    repos = list_repos(github, org, names)
+    summary = {repo["name"]: {"status": "missing"} for repo in repos if repo.get("missing")}
+    pending = sorted((repo for repo in repos if not repo.get("missing")), key=priority, reverse=True)
+    print(f"🚚 Migrating {len(pending)} repositories from {org} to {gitlab_group} "
+          f"({export_workers} export / {import_workers} import workers, queue of {queue_size})")
+
+    # The import scripts run as child processes; their own metrics files would overwrite this run's.
+    child_env = {k: v for k, v in os.environ.items() if k not in ("METRICS_FILE", "METRICS_PROM_FILE")}
+    sub_executor = ThreadPoolExecutor(max_workers=settings["workers"]) if settings["workers"] > 1 else None
+    # One store for the whole org, so a file attached in several repos is downloaded once.
+    attachment_store = AttachmentStore(os.path.join(backup_dir, "attachments"))
+    downloads = download_client(attachment_workers)
+    ready = queue.Queue(maxsize=queue_size)
+    summary_lock = threading.Lock()
+    started = time.time()
+
+    def record(name, **fields):
+        with summary_lock:
+            summary.setdefault(name, {}).update(fields)
+
+    # --- Export side (GitHub) ---
+    def export(repo):
+        name = repo["name"]
+        stage_started = time.time()
+        try:
+            with metrics.phase("export_code"):
+                if run("bash", os.path.join(SCRIPT_DIR, "export_github.sh"), org, name, backup_dir, env=child_env) != 0:
+                    raise RuntimeError("code export failed")
+            with metrics.phase("export_metadata"):
+                counts = RepoExporter(github, org, name, metadata_root, settings, sub_executor).run()
+            with metrics.phase("export_attachments"):
+                mirrored = mirror_attachments(
+                    downloads, attachment_store, scan_repo(os.path.join(metadata_root, name)), attachment_workers,
+                )
+        except Exception as e:
+            print(f"❌ Export of {org}/{name} failed: {e}")
+            record(name, status="export failed", error=str(e))
+            return
+        record(name, status="exported", issues=counts["issues"], pull_requests=counts["pull_requests"],
+               attachments=mirrored["urls"], attachments_failed=mirrored["failed"],
+               export_seconds=round(time.time() - stage_started, 1))
+        # Blocks while queue_size exported repos are already waiting for an import worker.
+        with metrics.phase("queue_wait"):
+            ready.put(name)
+
+    # --- Import side (GitLab) ---
+    def import_repo(name):
+        print(f"\n📥 Importing {name} into {gitlab_group}")
+        stage_started = time.time()
+        with metrics.phase("import_code"):
+            if run("bash", os.path.join(SCRIPT_DIR, "import_gitlab.sh"), gitlab_group, gitlab_host, backup_dir, name, env=child_env) != 0:
+                raise RuntimeError("code import failed")
+        with metrics.phase("import_metadata"):
+            if run(
+                sys.executable, os.path.join(SCRIPT_DIR, "import_metadata.py"), gitlab_group, gitlab_host, org, backup_dir,
+                env={**child_env, "IMPORT_REPOS": name},
+            ) != 0:
+                raise RuntimeError("metadata import failed")
+        record(name, status="ok", import_seconds=round(time.time() - stage_started, 1))
+
+    def import_worker():
+        while True:
+            name = ready.get()
+            if name is None:
+                return
+            try:
+                import_repo(name)
+            except Exception as e:
+                print(f"❌ Import of {name} failed: {e}")
+                record(name, status="import failed", error=str(e))
+
+    importers = [threading.Thread(target=import_worker) for _ in range(import_workers)]
+    for thread in importers:
+        thread.start()
+    with ThreadPoolExecutor(max_workers=export_workers) as pool:
+        list(pool.map(export, pending))
+    for _ in importers:
+        ready.put(None)
+    for thread in importers:
+        thread.join()
+
+    if sub_executor is not None:
+        sub_executor.shutdown()
+
+    # --- Summary ---
+    print(f"\n{'repo':<40} {'status':<14} {'issues':>7} {'PRs':>7} {'export s':>9} {'import s':>9}")
+    for name, result in sorted(summary.items()):
+        print(
+            f"{name:<40} {result['status']:<14} {result.get('issues', '-'):>7} {result.get('pull_requests', '-'):>7} "
+            f"{result.get('export_seconds', '-'):>9} {result.get('import_seconds', '-'):>9}"
+        )
+    print(f"⏱️ Total {time.time() - started:.1f}s")
+    os.makedirs(backup_dir, exist_ok=True)
+    with open(os.path.join(backup_dir, "migrate_summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    metrics.finish()
+
+    failed = [name for name, result in summary.items() if result["status"] != "ok"]
+    if failed:
+        print(f"\n⚠️ {len(failed)} repositories were not migrated: {', '.join(sorted(failed))}")
+        sys.exit(1)
+    print(f"\n🎉 Migration completed for {len(summary)} repositories")
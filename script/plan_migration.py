@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# Dry-run planner: estimates the API requests and wall time of an export and
+# import, and lists what the import would create, update or skip, without
+# writing to GitHub, GitLab or the backup.
+#
+# Repo statistics come from an existing backup in <backup_dir>/metadata/<repo>
+# when there is one, or otherwise from a few per_page=1 GitHub listings whose
+# rel="last" link gives the counts. With a GitLab group and host, the target
+# projects, their already imported issues and MRs and the import journals are
+# read as well. Settings are read from the same EXPORT_* / IMPORT_* variables
+# as the scripts themselves, so the plan matches the run they would make.
+import os
+import sys
+import json
+import math
+import time
+from collections import Counter
+from urllib.parse import quote
+
+from backup_io import find_records, read_records, records_fingerprint
+from export_metadata import GITHUB_API_URL, github_client, settings_from_env
+from export_org import list_repos
+from git_mirror import GitMirror
+from gitlab_project import build_import_index, find_group_path
+from graphql_export import ISSUE_PAGE_SIZE, NESTED_PAGE_SIZE, PR_PAGE_SIZE
+from http_client import ApiClient, count_items, get_paginated_data
+from journal import ImportJournal
+from metrics import Metrics
+from user_map import resolver_from_env
+
+# Per-item listings (comments, files, commits) are fetched without per_page.
+DEFAULT_PER_PAGE = 30
+# Rate-limit windows: GitHub's budget resets hourly, GitLab.com's every minute.
+GITHUB_WINDOW = 3600
+GITLAB_WINDOW = 60
+# Assumed seconds per request when the planner made none to that API.
+DEFAULT_LATENCY = 0.25
+
+REPO = "/repos/:owner/:repo"
+PROJECT = "/api/v4/projects/:project"
+
+
+def pages(count, per_page):
+    return max(1, math.ceil(count / per_page))
+
+
+# --- Repo statistics ---
+def item_profile(record):
+    def size(key):
+        value = record.get(key)
+        return len(value) if isinstance(value, list) else None
+
+    return {
+        "number": record["number"],
+        "closed": record.get("state") == "closed",
+        "comments": size("comments") or 0,
+        "review_comments": size("review_comments") or 0,
+        "files": size("files"),
+        "commits": size("commits"),
+        "assignees": [a["login"] for a in record.get("assignees") or []],
+        "assignee": (record.get("assignee") or {}).get("login"),
+    }
+
+
+def backup_profile(repo_path):
+    issues = [item_profile(i) for i in read_records(find_records(repo_path, "issues")) if "pull_request" not in i]
+    pulls = [item_profile(pr) for pr in read_records(find_records(repo_path, "pull_requests"))]
+    return {
+        "source": "backup",
+        "issues": issues,
+        "pull_requests": pulls,
+        "labels": [label["name"] for label in read_records(find_records(repo_path, "labels"))],
+        "milestones": [
+            (m["title"], m.get("state") == "closed") for m in read_records(find_records(repo_path, "milestones"))
+        ],
+    }
+
+
+def live_profile(github, org, repo):
+    # Only totals are known; comments are spread evenly over the items and file and
+    # commit lists are taken to fit on one page.
+    api_url = f"{GITHUB_API_URL}/repos/{org}/{repo}"
+    counts = {
+        name: count_items(github, f"{api_url}/{path}")
+        for name, path in (
+            ("all", "issues?state=all&per_page=1"),
+            ("closed", "issues?state=closed&per_page=1"),
+            ("pulls", "pulls?state=all&per_page=1"),
+            ("closed_pulls", "pulls?state=closed&per_page=1"),
+            ("comments", "issues/comments?per_page=1"),
+            ("review_comments", "pulls/comments?per_page=1"),
+            ("labels", "labels?per_page=1"),
+            ("milestones", "milestones?state=all&per_page=1"),
+        )
+    }
+    if None in counts.values():
+        print(f"❌ Could not read the statistics of {org}/{repo}")
+        return None
+    issue_count = counts["all"] - counts["pulls"]
+
+    def spread(total, count, index):
+        return total // count + (1 if index < total % count else 0) if count else 0
+
+    def items(count, closed, offset):
+        return [{
+            "number": None,
+            "closed": index < closed,
+            "comments": spread(counts["comments"], counts["all"], offset + index),
+            "review_comments": spread(counts["review_comments"], counts["pulls"], index) if offset else 0,
+            "files": None,
+            "commits": None,
+            "assignees": [],
+            "assignee": None,
+        } for index in range(count)]
+
+    return {
+        "source": "github",
+        "issues": items(issue_count, counts["closed"] - counts["closed_pulls"], 0),
+        "pull_requests": items(counts["pulls"], counts["closed_pulls"], issue_count),
+        "labels": [None] * counts["labels"],
+        "milestones": [(None, False)] * counts["milestones"],
+    }
+
+
+# --- Export estimate ---
+def export_requests(profile, settings, mirror):
+    requests = Counter()
+    issues, pulls = profile["issues"], profile["pull_requests"]
+    if settings["backend"] == "graphql":
+        requests["POST /graphql"] += pages(len(issues), ISSUE_PAGE_SIZE) + pages(len(pulls), PR_PAGE_SIZE)
+        # Nested connections longer than one batched page are followed up per item.
+        for item in issues + pulls:
+            for key in ("comments", "review_comments", "files", "commits"):
+                requests["POST /graphql"] += pages(item[key] or 0, NESTED_PAGE_SIZE) - 1
+    else:
+        # The issues listing includes pull requests.
+        requests[f"GET {REPO}/issues"] += pages(len(issues) + len(pulls), 100)
+        requests[f"GET {REPO}/pulls"] += pages(len(pulls), 100)
+        if settings["comments_mode"] == "repo":
+            comments = sum(item["comments"] for item in issues + pulls)
+            requests[f"GET {REPO}/issues/comments"] += pages(comments, 100)
+            requests[f"GET {REPO}/pulls/comments"] += pages(sum(pr["review_comments"] for pr in pulls), 100)
+        else:
+            for issue in issues:
+                if issue["comments"]:
+                    requests[f"GET {REPO}/issues/:number/comments"] += pages(issue["comments"], DEFAULT_PER_PAGE)
+            for pr in pulls:
+                requests[f"GET {REPO}/issues/:number/comments"] += pages(pr["comments"], DEFAULT_PER_PAGE)
+                requests[f"GET {REPO}/pulls/:number/comments"] += pages(pr["review_comments"], DEFAULT_PER_PAGE)
+        for pr in pulls:
+            requests[f"GET {REPO}/pulls/:number/requested_reviewers"] += 1
+            if mirror is None:
+                requests[f"GET {REPO}/pulls/:number/files"] += pages(pr["files"] or 0, DEFAULT_PER_PAGE)
+                requests[f"GET {REPO}/pulls/:number/commits"] += pages(pr["commits"] or 0, DEFAULT_PER_PAGE)
+    requests[f"GET {REPO}/labels"] += pages(len(profile["labels"]), 100)
+    requests[f"GET {REPO}/milestones"] += pages(len(profile["milestones"]), 100)
+    return requests
+
+
+# --- Import estimate ---
+def gitlab_state(gitlab, gitlab_api, group_path, repo):
+    # What the import would find in the project; an absent project is created empty by import_gitlab.sh.
+    state = {"exists": False, "labels": set(), "milestones": set(), "issues": {}, "merge_requests": {}}
+    resp = gitlab.get(f"{gitlab_api}/projects/{quote(f'{group_path}/{repo}', safe='')}")
+    if resp.status_code != 200:
+        return state
+    project_id = resp.json()["id"]
+    project_url = f"{gitlab_api}/projects/{project_id}"
+    state["exists"] = True
+    state["labels"] = {label["name"] for label in get_paginated_data(gitlab, f"{project_url}/labels?per_page=100")}
+    state["milestones"] = {m["title"] for m in get_paginated_data(gitlab, f"{project_url}/milestones?per_page=100")}
+    for kind, source in (("issues", "issue"), ("merge_requests", "PR")):
+        state[kind] = build_import_index(gitlab, gitlab_api, project_id, kind, source)
+    return state
+
+
+def import_plan(profile, state, journal):
+    requests = Counter()
+    actions = {}
+    requests[f"GET {PROJECT}"] += 1
+    requests[f"GET {PROJECT}/labels"] += pages(len(state["labels"]), 100)
+    requests[f"GET {PROJECT}/milestones"] += pages(len(state["milestones"]), 100)
+    requests[f"GET {PROJECT}/issues"] += pages(len(state["issues"]), 100)
+    requests[f"GET {PROJECT}/merge_requests"] += pages(len(state["merge_requests"]), 100)
+
+    labels = [name for name in profile["labels"] if name is None or name not in state["labels"]]
+    actions["labels"] = {"create": labels, "skip": [name for name in profile["labels"] if name in state["labels"]]}
+    requests[f"POST {PROJECT}/labels"] += len(labels)
+    milestones = [(title, closed) for title, closed in profile["milestones"] if title is None or title not in state["milestones"]]
+    actions["milestones"] = {
+        "create": [title for title, _ in milestones],
+        "skip": [title for title, _ in profile["milestones"] if title in state["milestones"]],
+    }
+    requests[f"POST {PROJECT}/milestones"] += len(milestones)
+    requests[f"PUT {PROJECT}/milestones/:number"] += sum(1 for _, closed in milestones if closed)
+
+    for kind, items in (("issues", profile["issues"]), ("merge_requests", profile["pull_requests"])):
+        plan = actions[kind] = {"create": [], "update": [], "skip": []}
+        for item in items:
+            number = item["number"]
+            entry = journal.get(kind, number) if journal and number is not None else None
+            if entry and entry["done"]:
+                plan["skip"].append(number)
+                continue
+            if entry and entry["iid"]:
+                # Resumed: only the notes and close the journal has not recorded.
+                plan["update"].append(number)
+                requests[f"POST {PROJECT}/{kind}/:number/notes"] += item["comments"] - len(entry["notes"])
+                if item["closed"] and not entry["closed"]:
+                    requests[f"PUT {PROJECT}/{kind}/:number"] += 1
+                continue
+            if number in state[kind]:
+                # Existing issues get their assignees refreshed; existing MRs are left alone.
+                if kind == "issues" and item["assignees"]:
+                    plan["update"].append(number)
+                    requests[f"PUT {PROJECT}/issues/:number"] += 1
+                else:
+                    plan["skip"].append(number)
+                continue
+            plan["create"].append(number)
+            requests[f"POST {PROJECT}/{kind}"] += 1
+            requests[f"POST {PROJECT}/{kind}/:number/notes"] += item["comments"]
+            if item["closed"]:
+                requests[f"PUT {PROJECT}/{kind}/:number"] += 1
+    return requests, actions
+
+
+# --- Wall time ---
+def rate_budget(client, window):
+    # Remaining requests and hourly/minutely capacity over the tokens the planner has heard from.
+    known = [c for c in client.credentials if c.remaining is not None and c.limit]
+    if not known:
+        return None
+    limit = max(c.limit for c in known)
+    remaining = sum(c.remaining for c in known) + limit * (len(client.credentials) - len(known))
+    reset_in = max(max(0.0, (c.reset_at or time.time()) - time.time()) for c in known)
+    return {"remaining": remaining, "capacity": limit * len(client.credentials), "reset_in": reset_in, "window": window}
+
+
+def average_latency(metrics):
+    summary = metrics.summary()
+    if not summary["requests"]:
+        return DEFAULT_LATENCY
+    return sum(e["seconds"] for e in summary["endpoints"]) / summary["requests"]
+
+
+def estimate_seconds(requests, latency, concurrency, budget):
+    # Latency-bound time, stretched to the resets the rate limit forces.
+    seconds = requests * latency / max(1, concurrency)
+    if budget and requests > budget["remaining"]:
+        windows = math.ceil((requests - budget["remaining"]) / budget["capacity"])
+        seconds = max(seconds, budget["reset_in"] + (windows - 1) * budget["window"])
+    return seconds
+
+
+def duration(seconds):
+    if seconds < 120:
+        return f"{seconds:.0f}s"
+    if seconds < 7200:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
+
+
+def print_endpoints(title, requests):
+    print(f"\n{title}")
+    for endpoint, count in sorted((+requests).items(), key=lambda e: -e[1]):
+        print(f"  {endpoint:<64} {count:>9}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (4, 6):
+        print("Usage: plan_migration.py <github_org> <comma_separated_repos_or_empty> <backup_dir> [<gitlab_group> <gitlab_host>]")
+        sys.exit(1)
+
+    org = sys.argv[1]
+    names = [name.strip() for name in sys.argv[2].split(",") if name.strip()]
+    backup_dir = sys.argv[3]
+    gitlab_group, gitlab_host = sys.argv[4:6] if len(sys.argv) == 6 else (None, None)
+    metadata_root = os.path.join(backup_dir, "metadata")
+
+    settings = settings_from_env()
+    try:
+        # The concurrency the scripts would run with, which spreads the latency-bound time.
+        import_workers = int(os.getenv("IMPORT_WORKERS", "1"))
+        item_workers = int(os.getenv("IMPORT_ITEM_WORKERS", "1"))
+        write_rate = float(os.getenv("IMPORT_WRITE_RATE", "0"))
+    except ValueError:
+        print("IMPORT_WORKERS, IMPORT_ITEM_WORKERS and IMPORT_WRITE_RATE must be numbers")
+        sys.exit(1)
+
+    # Probing stays out of METRICS_FILE; these only time the planner's own requests.
+    github_metrics = Metrics("plan_github")
+    github = github_client(github_metrics)
+    gitlab = gitlab_api = group_path = users = None
+    gitlab_metrics = Metrics("plan_gitlab")
+    if gitlab_group:
+        GL_TOKEN = os.getenv("GL_TOKEN")
+        if not GL_TOKEN:
+            print("GL_TOKEN must be set to plan the import")
+            sys.exit(1)
+        gitlab_api = f"{os.getenv('GITLAB_SCHEME', 'https')}://{gitlab_host}/api/v4"
+        gitlab = ApiClient({"PRIVATE-TOKEN": GL_TOKEN}, metrics=gitlab_metrics)
+        group_path = find_group_path(gitlab, gitlab_api, gitlab_group)
+        if group_path is None:
+            print("Group not found.")
+            sys.exit(1)
+        users = resolver_from_env(gitlab, gitlab_api, gitlab_host)
+
+    # Backed-up repos are planned from their backup; the rest are looked up on GitHub.
+    if not names and os.path.isdir(metadata_root):
+        names = sorted(n for n in os.listdir(metadata_root) if os.path.isdir(os.path.join(metadata_root, n)))
+    if not names:
+        names = [repo["name"] for repo in list_repos(github, org, names)]
+
+    print(f"📋 Planning {len(names)} repositories from {org}" + (f" to {gitlab_group}" if gitlab_group else ""))
+    if settings["state_dir"]:
+        print("⏩ EXPORT_STATE_DIR is set; estimates are for a full export, an incremental one makes fewer requests.")
+
+    plan = {}
+    export_total, import_total = Counter(), Counter()
+    logins = set()
+    for name in names:
+        repo_path = os.path.join(metadata_root, name)
+        profile = backup_profile(repo_path) if find_records(repo_path, "issues") else live_profile(github, org, name)
+        if profile is None:
+            plan[name] = {"source": "missing"}
+            continue
+        mirror = GitMirror.find(settings["mirror_dir"], org, name) if settings["mirror_dir"] and settings["backend"] == "rest" else None
+        exported = export_requests(profile, settings, mirror)
+        export_total.update(exported)
+        plan[name] = {
+            "source": profile["source"],
+            "issues": len(profile["issues"]),
+            "pull_requests": len(profile["pull_requests"]),
+            "comments": sum(item["comments"] for item in profile["issues"] + profile["pull_requests"]),
+            "export_requests": sum(exported.values()),
+            "export": dict(exported),
+        }
+
+        state = {"exists": False, "labels": set(), "milestones": set(), "issues": {}, "merge_requests": {}}
+        journal = None
+        if gitlab is not None:
+            state = gitlab_state(gitlab, gitlab_api, group_path, name)
+            journal_path = os.path.join(repo_path, "import_journal.jsonl")
+            journal = ImportJournal(journal_path, readonly=True) if os.path.exists(journal_path) else None
+        if journal is not None and journal.is_complete(records_fingerprint(repo_path)):
+            plan[name].update({"import_requests": 0, "import": {}, "actions": "already imported"})
+            continue
+        imported, actions = import_plan(profile, state, journal)
+        import_total.update(imported)
+        plan[name].update({
+            "project_exists": state["exists"],
+            "import_requests": sum(imported.values()),
+            "import": dict(imported),
+            "actions": actions,
+        })
+        for item in profile["issues"]:
+            logins.update(item["assignees"])
+        logins.update(pr["assignee"] for pr in profile["pull_requests"] if pr["assignee"])
+
+    if gitlab is not None:
+        import_total["GET /api/v4/groups"] += 1
+        import_total["GET /api/v4/users"] += sum(1 for login in logins if not users.is_known(login))
+
+    # --- Summary ---
+    print(f"\n{'repo':<40} {'source':<7} {'issues':>7} {'PRs':>7} {'comments':>9} {'export req':>11} {'import req':>11}")
+    for name, result in sorted(plan.items()):
+        print(
+            f"{name:<40} {result['source']:<7} {result.get('issues', '-'):>7} {result.get('pull_requests', '-'):>7} "
+            f"{result.get('comments', '-'):>9} {result.get('export_requests', '-'):>11} {result.get('import_requests', '-'):>11}"
+        )
+    print_endpoints("📤 Export requests by endpoint", export_total)
+    print_endpoints("📥 Import requests by endpoint", import_total)
+
+    # /rate_limit does not count against the budget; one call per token the planner has not used yet.
+    for _ in [c for c in github.credentials if c.remaining is None]:
+        github.get(f"{GITHUB_API_URL}/rate_limit")
+    github_budget = rate_budget(github, GITHUB_WINDOW)
+    export_seconds = estimate_seconds(
+        sum(export_total.values()), average_latency(github_metrics), settings["workers"], github_budget,
+    )
+    writes = sum(count for endpoint, count in import_total.items() if not endpoint.startswith("GET "))
+    notes = sum(count for endpoint, count in import_total.items() if endpoint.endswith("/notes"))
+    gitlab_latency = average_latency(gitlab_metrics)
+    gitlab_budget = rate_budget(gitlab, GITLAB_WINDOW) if gitlab is not None else None
+    # Each item's notes go out one at a time, item_workers items at once in each of the import_workers repos.
+    import_seconds = max(
+        estimate_seconds(sum(import_total.values()) - notes, gitlab_latency, import_workers, gitlab_budget)
+        + estimate_seconds(notes, gitlab_latency, import_workers * item_workers, None),
+        writes / write_rate if write_rate else 0,
+    )
+
+    print(f"\n⏱️ Export: {sum(export_total.values())} GitHub requests, about {duration(export_seconds)}"
+          + (f" ({github_budget['remaining']} left now, {github_budget['capacity']}/h over {len(github.credentials)} tokens)" if github_budget else ""))
+    print(f"⏱️ Import: {sum(import_total.values())} GitLab requests ({writes} writes), about {duration(import_seconds)}"
+          + ("" if gitlab is not None else " (no GitLab target given; assumes empty projects)"))
+
+    for name, result in sorted(plan.items()):
+        actions = result.get("actions")
+        if isinstance(actions, dict):
+            print(f"📝 {name}: " + "; ".join(
+                f"{kind} " + ", ".join(f"{verb} {len(items)}" for verb, items in counts.items())
+                for kind, counts in actions.items()
+            ))
+        elif actions:
+            print(f"📝 {name}: {actions}")
+
+    # PLAN_FILE receives the full plan, including the numbers and names behind every action.
+    plan_file = os.getenv("PLAN_FILE")
+    if plan_file:
+        with open(plan_file, "w") as f:
+            json.dump({
+                "org": org,
+                "gitlab_group": gitlab_group,
+                "export": {"requests": dict(export_total), "seconds": round(export_seconds)},
+                "import": {"requests": dict(import_total), "seconds": round(import_seconds)},
+                "repos": plan,
+            }, f, indent=2)
+        print(f"📄 Plan written to {plan_file}")
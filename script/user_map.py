@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# GitHub login -> GitLab user id resolution for the importer.
+#
+# Each distinct login is looked up once per run; results (including misses)
+# are kept in an on-disk cache with a TTL, and an optional mapping file can
+# pin logins to a GitLab username or user id.
+import fcntl
+import json
+import os
+import threading
+import time
+from urllib.parse import quote
+
+
+def resolver_from_env(client, api_url, gitlab_host):
+    # USER_CACHE_FILE persists GitHub login -> GitLab user id lookups for USER_CACHE_TTL seconds.
+    # USER_MAP_FILE is an optional JSON object mapping GitHub logins to GitLab usernames or ids.
+    return UserResolver(
+        client,
+        api_url,
+        cache_path=os.getenv(
+            "USER_CACHE_FILE",
+            os.path.join(os.path.expanduser("~"), ".cache", "action-hero", f"gitlab-users-{gitlab_host}.json"),
+        ),
+        ttl=int(os.getenv("USER_CACHE_TTL", str(7 * 24 * 3600))),
+        mapping_path=os.getenv("USER_MAP_FILE"),
+    )
+
+
+class UserResolver:
+    def __init__(self, client, api_url, cache_path=None, ttl=7 * 24 * 3600, mapping_path=None):
+        self.client = client
+        self.api_url = api_url
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.resolved = {}
+        self.cache = {}
+        self.mapping = {}
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path) as f:
+                self.cache = json.load(f)
+        if mapping_path:
+            with open(mapping_path) as f:
+                self.mapping = json.load(f)
+
+    def resolve(self, login):
+        with self.lock:
+            if login in self.resolved:
+                return self.resolved[login]
+        user_id = self._lookup(login)
+        with self.lock:
+            self.resolved[login] = user_id
+        return user_id
+
+    def resolve_many(self, logins):
+        user_ids = []
+        for login in logins:
+            user_id = self.resolve(login)
+            if user_id is None:
+                print(f" Assignee '{login}' not found in GitLab")
+            else:
+                user_ids.append(user_id)
+        return user_ids
+
+    def prefetch(self, logins):
+        logins = sorted(set(logins) - set(self.resolved))
+        print(f"👥 Resolving {len(logins)} GitHub users to GitLab accounts...")
+        for login in logins:
+            self.resolve(login)
+        found = sum(1 for login in logins if self.resolved[login] is not None)
+        print(f"✅ Resolved {found}/{len(logins)} users.")
+
+    def is_known(self, login):
+        # True when login resolves without an API request: mapped to an id or freshly cached.
+        mapped = self.mapping.get(login, login)
+        if isinstance(mapped, int):
+            return True
+        entry = self.cache.get(mapped)
+        return bool(entry) and time.time() - entry["resolved_at"] < self.ttl
+
+    def _lookup(self, login):
+        mapped = self.mapping.get(login, login)
+        if isinstance(mapped, int):
+            return mapped
+
+        entry = self.cache.get(mapped)
+        if entry and time.time() - entry["resolved_at"] < self.ttl:
+            return entry["id"]
+
+        resp = self.client.get(f"{self.api_url}/users?username={quote(mapped)}")
+        if resp.status_code != 200:
+            # Don't cache transient failures.
+            return None
+        matches = resp.json()
+        user_id = matches[0]["id"] if matches else None
+        with self.lock:
+            self.cache[mapped] = {"id": user_id, "resolved_at": time.time()}
+        return user_id
+
+    def save(self):
+        # Several import processes can share the cache: entries other processes saved
+        # meanwhile are merged in under a file lock, the newer lookup of a login winning.
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        with open(f"{self.cache_path}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            on_disk = {}
+            if os.path.exists(self.cache_path):
+                with open(self.cache_path) as f:
+                    on_disk = json.load(f)
+            with self.lock:
+                for login, entry in on_disk.items():
+                    if login not in self.cache or entry["resolved_at"] > self.cache[login]["resolved_at"]:
+                        self.cache[login] = entry
+                data = json.dumps(self.cache, indent=2)
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self.cache_path)